@@ -1,7 +1,18 @@
-from django.contrib import admin
+import codecs
+
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils.translation import gettext_lazy as _
 from .models import Article, Merchant, URL
-from .models import Delivery, DeliveryLocation, DeliverySlot
+from .models import Delivery, DeliveryLocation, DeliverySlot, DeliveryStock
+from .models import Job
+from .catalogue import import_articles
+from .orders import import_orders
+from .forms import ArticleImportForm, OrderImportForm
 from django import forms
 
 
@@ -23,10 +34,117 @@ class DeliverySlotForm(forms.ModelForm):
 class DeliverySlotAdmin(admin.ModelAdmin):
     form = DeliverySlotForm
 
+class DeliveryStockInline(admin.TabularInline):
+    model = DeliveryStock
+    fields = ['article', 'quantity', 'reserved']
+    readonly_fields = ['reserved']
+    extra = 1
+
+def render_import_form(admin, request, form, title, original=None):
+    return TemplateResponse(request, 'admin/baskets/import.html', {
+            **admin.admin_site.each_context(request),
+            'opts': admin.model._meta,
+            'original': original,
+            'title': title,
+            'form': form})
+
+class DeliveryAdmin(admin.ModelAdmin):
+    inlines = [DeliveryStockInline]
+    change_form_template = 'admin/baskets/delivery/change_form.html'
+
+    def get_urls(self):
+        return [path('<int:id>/import/',
+                     self.admin_site.admin_view(self.import_view),
+                     name='baskets_delivery_import_orders')] + \
+               super().get_urls()
+
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not DeliveryStock:
+            return super().save_formset(request, form, formset, change)
+        # `reserved` is updated concurrently by orders: never write back the
+        # value loaded with the form
+        for stock in formset.save(commit=False):
+            if stock._state.adding:
+                stock.save()
+            else:
+                stock.save(update_fields=['article', 'quantity'])
+        for stock in formset.deleted_objects:
+            stock.delete()
+
+    def import_view(self, request, id):
+        """Create carts from an uploaded CSV file of phone orders"""
+        if not (self.has_change_permission(request) and
+                        request.user.has_perms(['baskets.add_cart',
+                                                'baskets.add_cartitem'])):
+            raise PermissionDenied
+        delivery = get_object_or_404(Delivery, id=id)
+        form = OrderImportForm()
+        if request.method == 'POST':
+            form = OrderImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                lines = codecs.iterdecode(form.cleaned_data['file'],
+                                          'utf-8-sig')
+                try:
+                    carts = import_orders(delivery, lines)
+                except ValidationError as e:
+                    form.add_error('file', e)
+                except UnicodeDecodeError:
+                    form.add_error('file', _('File is not UTF-8 encoded.'))
+                else:
+                    msg = _('{count:d} order(s) imported.').format(
+                                                            count=len(carts))
+                    messages.success(request, msg)
+                    return HttpResponseRedirect(
+                            reverse('admin:baskets_delivery_change',
+                                    args=[delivery.id]))
+        return render_import_form(self, request, form, _('Import orders'),
+                                  delivery)
+
+class ArticleAdmin(admin.ModelAdmin):
+    list_display = ['code', 'label', 'unit_price', 'unit_type']
+    change_list_template = 'admin/baskets/article/change_list.html'
+
+    def get_urls(self):
+        return [path('import/',
+                     self.admin_site.admin_view(self.import_view),
+                     name='baskets_article_import')] + super().get_urls()
+
+    def import_view(self, request):
+        """Create or update articles from an uploaded CSV file"""
+        if not (self.has_add_permission(request) and
+                        self.has_change_permission(request)):
+            raise PermissionDenied
+        form = ArticleImportForm()
+        if request.method == 'POST':
+            form = ArticleImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                # Decode uploaded file line by line
+                lines = codecs.iterdecode(form.cleaned_data['file'],
+                                          'utf-8-sig')
+                try:
+                    counts = import_articles(lines)
+                except ValidationError as e:
+                    form.add_error('file', e)
+                except UnicodeDecodeError:
+                    form.add_error('file', _('File is not UTF-8 encoded.'))
+                else:
+                    msg = _('{created:d} created, {updated:d} updated, '
+                            '{unchanged:d} unchanged.').format(**counts)
+                    messages.success(request, msg)
+                    return HttpResponseRedirect(
+                            reverse('admin:baskets_article_changelist'))
+        return render_import_form(self, request, form, _('Import articles'))
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'key', 'status', 'attempts', 'run_after']
+    list_filter = ['status', 'name']
+
 
 admin.site.register(Merchant)
 admin.site.register(URL)
-admin.site.register(Article)
-admin.site.register(Delivery)
+admin.site.register(Article, ArticleAdmin)
+admin.site.register(Delivery, DeliveryAdmin)
 admin.site.register(DeliverySlot, DeliverySlotAdmin)
 admin.site.register(DeliveryLocation)
+admin.site.register(Job, JobAdmin)
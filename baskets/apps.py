@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class BasketsConfig(AppConfig):
     name = 'baskets'
+
+    def ready(self):
+        # Connect signal receivers
+        from . import search  # noqa: F401
+        # Register job functions
+        from . import tasks  # noqa: F401
@@ -0,0 +1,63 @@
+"""
+Move closed carts of past deliveries out of the hot tables
+
+Only carts of upcoming deliveries are read when taking orders and preparing
+baskets. Delivered and abandoned carts are moved, with their items and
+status history, into `Archived*` tables which keep the same shape so that
+reporting queries can run against them.
+"""
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Cart, CartItem, CartStatus, CartStatusChange, \
+                    Delivery, \
+                    ArchivedCart, ArchivedCartItem, ArchivedCartStatusChange
+
+
+def get_archivable_carts(before):
+    """
+    Return closed carts of deliveries whose last slot ended before `before`
+    """
+    past = Delivery.objects.annotate(end=Max('slots__end')) \
+                           .filter(end__lt=before)
+    return Cart.objects.filter(
+                    status__in=(CartStatus.DELIVERED, CartStatus.ABANDONED),
+                    slot__delivery__in=past)
+
+
+def _archive_batch(ids):
+    ArchivedCart.objects.bulk_create([
+            ArchivedCart(**c)
+            for c in Cart.objects.filter(id__in=ids).values(
+                        'id', 'user_id', 'slot_id', 'status', 'packer_id',
+                        'annotation')])
+    ArchivedCartItem.objects.bulk_create([
+            ArchivedCartItem(**i)
+            for i in CartItem.objects.filter(cart_id__in=ids).values(
+                        'cart_id', 'article_id', 'label', 'unit_price',
+                        'unit_type', 'quantity')])
+    ArchivedCartStatusChange.objects.bulk_create([
+            ArchivedCartStatusChange(**c)
+            for c in CartStatusChange.objects.filter(cart_id__in=ids).values(
+                        'cart_id', 'from_status', 'to_status', 'user_id',
+                        'timestamp')])
+    # Items and status changes go away with their cart (cascade)
+    Cart.objects.filter(id__in=ids).delete()
+
+
+def archive_carts(before, batch_size=500):
+    """
+    Archive closed carts of deliveries that ended before `before`, `batch_size`
+    carts per transaction. Return the number of archived carts.
+    """
+    qs = get_archivable_carts(before).order_by('id')
+    count = 0
+    while True:
+        with transaction.atomic():
+            ids = list(qs.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            _archive_batch(ids)
+        count += len(ids)
+    return count
@@ -0,0 +1,114 @@
+"""
+Article catalogue import from CSV
+
+The CSV file has a header line with `code`, `label`, `unit_price` and
+`unit_type` columns (comma, semicolon or tab separated). Rows are compared
+with existing articles by code, then new and changed articles are saved
+with a few bulk queries in a single transaction.
+"""
+
+import csv
+import itertools
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from .models import Article, UnitType
+from .search import drop_index, fold
+
+
+COLUMNS = ('code', 'label', 'unit_price', 'unit_type')
+FIELDS = ('label', 'unit_price', 'unit_type')
+
+
+def _parse(row, line):
+    """
+    Return (code, {field: value}) read from CSV `row` found at `line`
+    """
+    try:
+        code = int(row['code'])
+        label = row['label'].strip()
+        unit_price = Decimal(row['unit_price'].strip().replace(',', '.')) \
+                            .quantize(Decimal('0.01'))
+        unit_type = UnitType(row['unit_type'].strip().upper())
+        # Bounds of code and unit_price fields
+        if not label or not 0 < code <= 32767 or \
+                        not 0 <= unit_price < 1000:
+            raise ValueError
+    except (ValueError, InvalidOperation, AttributeError):
+        # AttributeError: missing cell
+        raise ValidationError(
+                _('Line {line:d}: invalid article.').format(line=line),
+                code='invalid')
+    return code, {'label': label, 'unit_price': unit_price,
+                  'unit_type': unit_type.value}
+
+
+def read_csv(lines, columns):
+    """
+    Return a `csv.DictReader` over `lines` (an iterable of strings, such as
+    a text file), whose header must hold `columns`
+    """
+    lines = iter(lines)
+    header = next(lines, '')
+    try:
+        dialect = csv.Sniffer().sniff(header, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(itertools.chain([header], lines), dialect=dialect)
+    if not reader.fieldnames or not set(columns) <= set(reader.fieldnames):
+        raise ValidationError(
+                _('Expected columns: {columns:s}.').format(
+                                            columns=', '.join(columns)),
+                code='invalid')
+    return reader
+
+
+def read_articles(lines):
+    """
+    Yield (code, {field: value}) for each article in CSV `lines`
+    """
+    reader = read_csv(lines, COLUMNS)
+    for row in reader:
+        yield _parse(row, reader.line_num)
+
+
+def import_articles(lines, batch_size=500, dry_run=False):
+    """
+    Create or update articles listed in CSV `lines`, matched by code.
+    Articles missing from the file are left untouched. Return the number
+    of created, updated and unchanged articles.
+    """
+    existing = {a.code: a for a in Article.objects.all()}
+    created, updated, seen = [], [], set()
+    unchanged = 0
+    for code, values in read_articles(lines):
+        if code in seen:
+            raise ValidationError(
+                    _('Article {code:d} is listed twice.').format(code=code),
+                    code='duplicate')
+        seen.add(code)
+        article = existing.get(code)
+        if article is None:
+            created.append(Article(code=code, **values))
+        elif any(getattr(article, f) != values[f] for f in FIELDS):
+            for f in FIELDS:
+                setattr(article, f, values[f])
+            updated.append(article)
+        else:
+            unchanged += 1
+
+    if not dry_run:
+        # Otherwise set on save, see `baskets.search`
+        for article in created + updated:
+            article.search_label = fold(article.label)
+        with transaction.atomic():
+            Article.objects.bulk_create(created, batch_size=batch_size)
+            Article.objects.bulk_update(updated, FIELDS + ('search_label',),
+                                        batch_size=batch_size)
+        # Bulk queries do not send signals
+        drop_index()
+    return {'created': len(created), 'updated': len(updated),
+            'unchanged': unchanged}
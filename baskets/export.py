@@ -0,0 +1,127 @@
+"""
+Order history export for offline analysis
+
+Cart items are streamed from the database in chunks, joined with their
+cart, slot, delivery and location, and appended to a compressed file: a
+Parquet file when pyarrow is installed, a gzipped CSV file otherwise.
+Memory use does not depend on the number of exported items.
+
+Current cart items change in place (quantities, deleted lines, cart
+status), so they are always exported in full, as a snapshot. Archived items
+(see `baskets.archive`) never change: they are exported incrementally, only
+items with an id above a watermark (the last exported id) being written.
+Archive runs must not overlap with exports, lest an archive transaction
+commits items below the watermark after it was taken.
+"""
+
+import csv
+import gzip
+import itertools
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# (column name, field path from the item model)
+COLUMNS = (
+    ('id', 'id'),
+    ('cart_id', 'cart'),
+    ('status', 'cart__status'),
+    ('user_id', 'cart__user'),
+    ('delivery_id', 'cart__slot__delivery'),
+    ('location', 'cart__slot__delivery__location__name'),
+    ('slot_start', 'cart__slot__start'),
+    ('article_id', 'article'),
+    ('label', 'label'),
+    ('unit_type', 'unit_type'),
+    ('unit_price', 'unit_price'),
+    ('quantity', 'quantity'),
+)
+
+FORMATS = ('parquet', 'csv')
+
+
+def get_default_format():
+    return 'parquet' if pyarrow is not None else 'csv'
+
+
+class CSVWriter:
+    extension = 'csv.gz'
+
+    def __init__(self, path):
+        self.file = gzip.open(path, 'wt', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(name for name, _ in COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    extension = 'parquet'
+
+    def __init__(self, path):
+        self.schema = pyarrow.schema([
+            ('id', pyarrow.int64()),
+            ('cart_id', pyarrow.int64()),
+            ('status', pyarrow.int16()),
+            ('user_id', pyarrow.int64()),
+            ('delivery_id', pyarrow.int64()),
+            ('location', pyarrow.string()),
+            ('slot_start', pyarrow.timestamp('us', tz='UTC')),
+            ('article_id', pyarrow.int64()),
+            ('label', pyarrow.string()),
+            ('unit_type', pyarrow.string()),
+            ('unit_price', pyarrow.decimal128(5, 2)),
+            ('quantity', pyarrow.decimal128(6, 3)),
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema,
+                                                    compression='zstd')
+
+    def write(self, rows):
+        # One row group per chunk
+        columns = [list(c) for c in zip(*rows)]
+        self.writer.write_table(pyarrow.Table.from_arrays(
+                    [pyarrow.array(c, type=f.type)
+                                    for c, f in zip(columns, self.schema)],
+                    schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {'parquet': ParquetWriter, 'csv': CSVWriter}
+
+
+def export_items(model, path, format, after_id=0, chunk_size=2000):
+    """
+    Write items of `model` (`CartItem` or `ArchivedCartItem`) with an id
+    above `after_id` to `path`, `chunk_size` rows at a time. Nothing is
+    written when there is no such item. Return the number of exported items
+    and the last exported id.
+    """
+    rows = model.objects.filter(id__gt=after_id) \
+                        .order_by('id') \
+                        .values_list(*(field for _, field in COLUMNS)) \
+                        .iterator(chunk_size=chunk_size)
+    count, last_id, writer = 0, after_id, None
+    try:
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            if writer is None:
+                writer = WRITERS[format](path)
+            writer.write(chunk)
+            count += len(chunk)
+            last_id = chunk[-1][0]
+    finally:
+        if writer is not None:
+            writer.close()
+    return count, last_id
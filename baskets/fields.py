@@ -0,0 +1,63 @@
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+
+from django import forms
+from django.core import exceptions
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class FixedPointField(models.IntegerField):
+    """
+    Decimal number stored as an integer number of its smallest unit (e.g.
+    cents for a price with 2 decimal places, grams for a weight in Kg with 3
+    decimal places).
+
+    Python code deals with `Decimal` values while the database computes
+    totals and aggregations on native integers.
+    """
+    description = _('Fixed-point decimal number stored as an integer')
+
+    def __init__(self, *args, decimal_places=2, max_digits=None, **kwargs):
+        self.decimal_places = decimal_places
+        self.max_digits = max_digits
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['decimal_places'] = self.decimal_places
+        if self.max_digits is not None:
+            kwargs['max_digits'] = self.max_digits
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Decimal(int(value)).scaleb(-self.decimal_places)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Decimal):
+            return value
+        try:
+            if isinstance(value, float):
+                return Decimal(str(value))
+            return Decimal(value)
+        except (InvalidOperation, TypeError, ValueError):
+            raise exceptions.ValidationError(
+                    _('“%(value)s” value must be a decimal number.'),
+                    code='invalid',
+                    params={'value': value})
+
+    def get_prep_value(self, value):
+        value = self.to_python(value)
+        if value is None:
+            return None
+        return int(value.scaleb(self.decimal_places)
+                        .to_integral_value(ROUND_HALF_UP))
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{
+            'form_class': forms.DecimalField,
+            'decimal_places': self.decimal_places,
+            'max_digits': self.max_digits,
+            **kwargs,
+        })
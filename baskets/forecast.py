@@ -0,0 +1,128 @@
+"""
+Forecast of the quantities needed for a delivery
+
+Quantities ordered per article in past deliveries at the same location are
+loaded into a (articles x deliveries) NumPy matrix. Projections are an
+exponentially weighted moving average over the last `FORECAST_WINDOW`
+deliveries, computed for the whole catalogue at once.
+
+NumPy is optional: without it, no projection is made.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+
+from .models import Article, Delivery, CartItem, ArchivedCartItem, CartStatus
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Rows fetched at once from the database
+CHUNK_SIZE = 2000
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for row in iterable:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def get_history(delivery):
+    """
+    Return ids of the last `FORECAST_WINDOW` deliveries made at the
+    location of `delivery` before it and already over (oldest first), so
+    that deliveries still taking orders are left out, ids of the articles
+    ordered then, and a matrix of quantities ordered per article (rows) and
+    per delivery (columns)
+    """
+    start = delivery.slots.aggregate(start=Min('start'))['start']
+    delivery_ids = np.empty(0, dtype=np.int64)
+    if start is not None:
+        delivery_ids = np.fromiter(
+                Delivery.objects.filter(location__id=delivery.location_id)
+                                .annotate(start=Min('slots__start'),
+                                          end=Max('slots__end'))
+                                .filter(start__lt=start,
+                                        end__lt=timezone.now())
+                                .order_by('-start')
+                                .values_list('id', flat=True)
+                                [:settings.FORECAST_WINDOW],
+                dtype=np.int64)[::-1]
+    if not len(delivery_ids):
+        return delivery_ids, np.empty(0, dtype=np.int64), np.zeros((0, 0))
+
+    # (article, delivery, quantity) triples, from live and archived carts
+    chunks = []
+    for Item in (CartItem, ArchivedCartItem):
+        rows = Item.objects.filter(
+                                cart__slot__delivery__id__in=delivery_ids.tolist(),
+                                article__isnull=False) \
+                           .exclude(cart__status=CartStatus.ABANDONED) \
+                           .values_list('article', 'cart__slot__delivery') \
+                           .annotate(quantity=Sum('quantity')) \
+                           .order_by()
+        rows = rows.iterator(chunk_size=CHUNK_SIZE)
+        for chunk in _chunks(rows, CHUNK_SIZE):
+            chunks.append(np.array(chunk, dtype=np.float64))
+    if not chunks:
+        return delivery_ids, np.empty(0, dtype=np.int64), \
+               np.zeros((0, len(delivery_ids)))
+    triples = np.concatenate(chunks)
+
+    article_ids, rows = np.unique(triples[:, 0].astype(np.int64),
+                                  return_inverse=True)
+    # Column of each delivery id, in chronological order
+    order = np.argsort(delivery_ids)
+    columns = order[np.searchsorted(delivery_ids[order],
+                                    triples[:, 1].astype(np.int64))]
+    quantities = np.zeros((len(article_ids), len(delivery_ids)))
+    np.add.at(quantities, (rows.ravel(), columns), triples[:, 2])
+    return delivery_ids, article_ids, quantities
+
+
+def forecast_quantities(delivery):
+    """
+    Return a dict of projected quantities for `delivery`, by article id.
+    Empty when NumPy is not installed or there is no history.
+    """
+    if np is None:
+        return {}
+    delivery_ids, article_ids, quantities = get_history(delivery)
+    if not len(article_ids):
+        return {}
+
+    window = min(settings.FORECAST_WINDOW, quantities.shape[1])
+    # Most recent delivery weighs most
+    weights = settings.FORECAST_DECAY ** np.arange(window)[::-1]
+    projected = quantities[:, -window:] @ weights / weights.sum()
+    return {int(a): Decimal(str(round(q, 3)))
+                for a, q in zip(article_ids, projected) if q > 0}
+
+
+def get_needed_quantities(delivery):
+    """
+    Return `delivery.get_needed_quantities()` rows with a `forecast` entry
+    each, followed by articles expected but not ordered yet
+    """
+    forecast = forecast_quantities(delivery)
+    orders = list(delivery.get_needed_quantities())
+    for o in orders:
+        o['forecast'] = forecast.pop(o['article'], None)
+    expected = Article.objects.filter(id__in=forecast) \
+                              .values('id', 'label', 'unit_type') \
+                              .order_by('label')
+    orders += [{'article': a['id'], 'label': a['label'],
+                'unit_type': a['unit_type'], 'quantity': 0,
+                'forecast': forecast[a['id']]} for a in expected]
+    return orders
@@ -1,10 +1,11 @@
+from decimal import Decimal
 from django import forms
 from django.db.models import Count
 from django.utils.formats import date_format
 from django.utils.timezone import localtime
 from django.utils.translation import gettext_lazy as _
 
-from .models import Article, Cart
+from .models import Article, Cart, Delivery
 
 
 class SlotSelect(forms.Select):
@@ -37,6 +38,7 @@ class SlotForm(forms.Form):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['slot'].queryset = self.initial['slot'].delivery.slots \
+                                        .select_related('delivery') \
                                         .annotate(cart_count=Count('carts'))
 
     def clean_slot(self):
@@ -56,6 +58,25 @@ class AnnotationForm(forms.ModelForm):
 class DelItemForm(forms.Form):
     del_submit = forms.IntegerField()
 
+class ReorderForm(forms.Form):
+    delivery = forms.ModelChoiceField(queryset=Delivery.objects.all())
+
 class CartItemForm(forms.Form):
-    article = forms.ModelChoiceField(queryset=Article.objects.all())
-    quantity = forms.DecimalField(max_digits=6, decimal_places=5)
+    # Articles are entered by code (see `article_search` view) rather than
+    # picked in a list of the whole catalogue
+    article = forms.ModelChoiceField(queryset=Article.objects.all(),
+                                     to_field_name='code',
+                                     widget=forms.TextInput)
+    quantity = forms.DecimalField(max_digits=6, decimal_places=5,
+                                  min_value=Decimal('0.001'))
+
+class ArticleImportForm(forms.Form):
+    file = forms.FileField(
+            label=_('CSV file'),
+            help_text=_('Columns: code, label, unit_price, unit_type (U or W)'))
+
+class OrderImportForm(forms.Form):
+    file = forms.FileField(
+            label=_('CSV file'),
+            help_text=_('Columns: customer (username), article (code), '
+                        'quantity. One line per article.'))
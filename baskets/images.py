@@ -0,0 +1,68 @@
+"""
+Resized variants of uploaded pictures
+
+Variants are generated once, by a background job run after a picture is
+uploaded, and named after the original file so that their URLs can be
+computed without any file I/O when rendering pages. Pages only list them
+once `Merchant.picture_variants` records they were made.
+"""
+
+import io
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image
+
+
+# Widths (in pixels) of generated variants
+PICTURE_WIDTHS = (320, 640, 1280)
+
+# Variant formats: (file extension, Pillow format, save options)
+VARIANT_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80}),
+    ('jpg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+)
+
+
+def get_variant_name(name, width, ext):
+    root, _ = os.path.splitext(name)
+    return '{0}_{1:d}w.{2}'.format(root, width, ext)
+
+
+def get_variant_widths(original_width):
+    """
+    Return widths of variants made for a picture `original_width` wide
+    (pictures are never upscaled)
+    """
+    if not original_width:
+        return []
+    return [w for w in PICTURE_WIDTHS if w < original_width]
+
+
+def make_variants(field_file):
+    """
+    Save resized WebP and JPEG variants of `field_file` next to it, skipping
+    those already present
+    """
+    storage = field_file.storage
+    with field_file.open('rb') as f:
+        original = Image.open(f)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'A' in original.mode else 'RGB')
+
+    for width in get_variant_widths(original.width):
+        height = round(original.height * width / original.width)
+        resized = None
+        for ext, fmt, options in VARIANT_FORMATS:
+            name = get_variant_name(field_file.name, width, ext)
+            if storage.exists(name):
+                continue
+            if resized is None:
+                resized = original.resize((width, height), Image.LANCZOS)
+            img = resized
+            if fmt == 'JPEG' and img.mode != 'RGB':
+                img = img.convert('RGB')
+            buf = io.BytesIO()
+            img.save(buf, fmt, **options)
+            storage.save(name, ContentFile(buf.getvalue()))
@@ -0,0 +1,195 @@
+"""
+Background jobs stored in the database
+
+Functions registered with `register` are queued with `Job.enqueue(name,
+**kwargs)` and run by `manage.py run_jobs`, outside of requests. Workers
+claim pending jobs in batches, run them (in a few threads at most) and
+delete them once done. Failed jobs are retried later, up to
+`JOBS_MAX_ATTEMPTS` times, then kept with status FAILED.
+
+Batch jobs receive the list of all kwargs of the claimed jobs with their
+name in a single call, so that they can share work (a database query, a
+mail server connection...).
+"""
+
+import datetime
+import json
+import logging
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from .models import Job, JobStatus
+
+
+logger = logging.getLogger(__name__)
+
+# Job functions by name: (function, batch)
+_registry = {}
+
+# Jobs being run by the current thread
+_current = threading.local()
+
+
+def register(name, batch=False):
+    """
+    Decorator registering a job function under `name`. Batch functions
+    are called with a list of kwargs instead of kwargs.
+    """
+    def decorator(func):
+        _registry[name] = (func, batch)
+        return func
+    return decorator
+
+
+def claim(limit):
+    """
+    Mark up to `limit` due jobs as running and return them. Jobs running
+    for more than `JOBS_TIMEOUT` seconds (their worker died) are claimed
+    again, which counts as a failed attempt.
+    """
+    now = timezone.now()
+    stale = now - datetime.timedelta(seconds=settings.JOBS_TIMEOUT)
+    timed_out = Q(status=JobStatus.RUNNING, claimed_at__lt=stale)
+    due = Q(status=JobStatus.PENDING, run_after__lte=now) | timed_out
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        # Jobs which keep crashing or hanging their worker are given up
+        dead = Job.objects.filter(
+                    timed_out,
+                    attempts__gte=settings.JOBS_MAX_ATTEMPTS - 1)
+        for j in dead:
+            logger.error('Job %s failed: timed out', j)
+        dead.update(status=JobStatus.FAILED,
+                    attempts=F('attempts') + 1,
+                    error='Timed out after {0:d} seconds'.format(
+                                                    settings.JOBS_TIMEOUT))
+        qs = Job.objects.filter(due).order_by('run_after', 'id')
+        # As for carts, concurrent workers skip each other's rows where
+        # possible. The conditional UPDATE prevents double claims anyway.
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        ids = list(qs.values_list('id', flat=True)[:limit])
+        Job.objects.filter(due, id__in=ids) \
+                   .update(status=JobStatus.RUNNING, claimed_by=token,
+                           claimed_at=now,
+                           attempts=Case(
+                                When(status=JobStatus.RUNNING,
+                                     then=F('attempts') + 1),
+                                default=F('attempts')))
+    return list(Job.objects.filter(claimed_by=token).order_by('id'))
+
+
+def get_claim():
+    """
+    Return the token of the claim on the jobs being run by this thread.
+    Rows marked with it are known to be abandoned when no running job holds
+    it anymore (the job failed, or its worker died and it was claimed
+    again).
+    """
+    return getattr(_current, 'claim', None)
+
+
+def get_live_claims():
+    """
+    Return a queryset of the tokens of running jobs
+    """
+    return Job.objects.filter(status=JobStatus.RUNNING) \
+                      .values('claimed_by')
+
+
+def _done(jobs):
+    Job.objects.filter(id__in=[j.id for j in jobs]).delete()
+
+
+def _failed(jobs, error):
+    # Keyed jobs queued again while running are covered by the new job
+    keys = {(j.name, j.key) for j in jobs if j.key}
+    if keys:
+        pending = set(Job.objects.filter(status=JobStatus.PENDING,
+                                         name__in={n for n, _ in keys},
+                                         key__in={k for _, k in keys})
+                                 .values_list('name', 'key'))
+        covered = [j for j in jobs if (j.name, j.key) in pending]
+        _done(covered)
+        jobs = [j for j in jobs if (j.name, j.key) not in pending]
+    for j in jobs:
+        j.attempts += 1
+        j.error = error
+        if j.attempts < settings.JOBS_MAX_ATTEMPTS:
+            # Exponential backoff
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (j.attempts - 1)
+            j.status = JobStatus.PENDING
+            j.run_after = timezone.now() + datetime.timedelta(seconds=delay)
+        else:
+            j.status = JobStatus.FAILED
+            logger.error('Job %s failed: %s', j, error)
+    Job.objects.bulk_update(jobs, ['attempts', 'error', 'status',
+                                   'run_after'])
+
+
+def _units(jobs):
+    """
+    Split claimed `jobs` into lists run by a single call: all jobs with the
+    same name for batch jobs, one job otherwise
+    """
+    groups = {}
+    for j in jobs:
+        groups.setdefault(j.name, []).append(j)
+    for name, group in groups.items():
+        if _registry.get(name, (None, False))[1]:
+            yield group
+        else:
+            yield from ([j] for j in group)
+
+
+def _run(jobs):
+    """
+    Run `jobs` (a unit of work, see `_units`) and record the outcome
+    """
+    name = jobs[0].name
+    _current.claim = jobs[0].claimed_by
+    try:
+        if name not in _registry:
+            raise LookupError('No job registered as {0!r}'.format(name))
+        func, batch = _registry[name]
+        if batch:
+            func([json.loads(j.args) for j in jobs])
+        else:
+            func(**json.loads(jobs[0].args))
+    except Exception:
+        _failed(jobs, traceback.format_exc())
+    else:
+        _done(jobs)
+    finally:
+        _current.claim = None
+
+
+def _run_in_thread(jobs):
+    try:
+        _run(jobs)
+    finally:
+        connections.close_all()
+
+
+def run_pending(batch_size=50, concurrency=1):
+    """
+    Claim and run a batch of due jobs, in up to `concurrency` threads.
+    Return the number of claimed jobs.
+    """
+    jobs = claim(batch_size)
+    units = list(_units(jobs))
+    if concurrency <= 1 or len(units) <= 1:
+        for unit in units:
+            _run(unit)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Consumed so that errors raised in threads are not lost
+            list(executor.map(_run_in_thread, units))
+    return len(jobs)
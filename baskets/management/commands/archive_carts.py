@@ -0,0 +1,24 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from baskets.archive import archive_carts
+
+
+class Command(BaseCommand):
+    help = 'Move closed carts of past deliveries into archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                '--days', type=int, default=settings.CART_ARCHIVE_DAYS,
+                help='Archive deliveries over for that many days')
+        parser.add_argument(
+                '--batch-size', type=int, default=500,
+                help='Number of carts moved per transaction')
+
+    def handle(self, *args, **options):
+        before = now() - datetime.timedelta(days=options['days'])
+        count = archive_carts(before, options['batch_size'])
+        self.stdout.write('{0} cart(s) archived.'.format(count))
@@ -0,0 +1,88 @@
+import copy
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from baskets import views
+from baskets.models import Delivery
+
+
+def get_template_settings(cached):
+    """
+    Copy of TEMPLATES with explicit loaders, cached or not
+    """
+    templates = copy.deepcopy(settings.TEMPLATES)
+    loaders = ['django.template.loaders.filesystem.Loader',
+               'django.template.loaders.app_directories.Loader']
+    if cached:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+    for t in templates:
+        t['APP_DIRS'] = False
+        t.setdefault('OPTIONS', {})['loaders'] = loaders
+    return templates
+
+
+class Command(BaseCommand):
+    help = 'Measure render time per view without, then with, template caching'
+
+    def add_arguments(self, parser):
+        parser.add_argument('delivery', type=int,
+                            help='Delivery id, it must have an active cart')
+        parser.add_argument('username',
+                            help='User allowed to prepare baskets and view '
+                                 'needed quantities')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            delivery = Delivery.objects.get(id=options['delivery'])
+            user = User.objects.get(username=options['username'])
+        except (Delivery.DoesNotExist, User.DoesNotExist) as e:
+            raise CommandError(e)
+        cart = delivery.get_active_carts().first()
+        if cart is None:
+            raise CommandError('This delivery has no active cart.')
+
+        pages = [
+            (views.cart, 'cart', cart.id, cart.user),
+            (views.prepare_basket, 'prepare_basket', cart.id, user),
+            (views.prepare_baskets, 'prepare_baskets', delivery.id, user),
+            (views.needed_quantities, 'needed_quantities', None, user),
+        ]
+        configs = [
+            ('before', {
+                'TEMPLATES': get_template_settings(False),
+                'CACHES': {'default': {
+                    'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}}),
+            ('after', {
+                'TEMPLATES': get_template_settings(True),
+                'CACHES': {'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}}),
+        ]
+
+        factory = RequestFactory()
+        results = {}
+        for config, overrides in configs:
+            with override_settings(**overrides):
+                for view, name, id, u in pages:
+                    args = [] if id is None else [id]
+                    request = factory.get(reverse(name, args=args))
+                    request.user = u
+                    start = time.perf_counter()
+                    for i in range(options['repeat']):
+                        response = view(request, *args)
+                        if response.status_code != 200:
+                            raise CommandError('{0} returned {1}'.format(
+                                                name, response.status_code))
+                    elapsed = time.perf_counter() - start
+                    results[(config, name)] = elapsed * 1000 / options['repeat']
+
+        self.stdout.write('{0:20} {1:>10} {2:>10}'.format(
+                                                'view', 'before', 'after'))
+        for view, name, id, u in pages:
+            self.stdout.write('{0:20} {1:>8.2f}ms {2:>8.2f}ms'.format(
+                        name, results[('before', name)], results[('after', name)]))
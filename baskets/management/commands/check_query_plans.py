@@ -0,0 +1,70 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from baskets.models import Cart, Delivery, DeliverySlot
+
+
+# Plan lines revealing a full table scan, per database vendor
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (TABLE )?\w+( AS \w+)?$'),
+    'postgresql': re.compile(r'\bSeq Scan on '),
+}
+
+
+def get_hot_querysets():
+    """
+    Return (name, queryset) pairs for the queries run on every delivery
+    page. Filter values do not matter, only the plan does.
+    """
+    delivery = Delivery(id=0)
+    user = User(id=0)
+    return [
+        ('Delivery.get_active_carts', delivery.get_active_carts()),
+        ('Delivery.get_needed_quantities', delivery.get_needed_quantities()),
+        ('Delivery.__str__ (first slot)', delivery.slots.order_by('start')),
+        ('new_cart (free slot)',
+            DeliverySlot.objects.filter(delivery=delivery)
+                                .annotate(cart_count=Count('carts'))
+                                .filter(cart_count__lt=1)
+                                .order_by('start')),
+        ('carts of a user', Cart.objects.filter(user=user)),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on hot querysets and fail on full table scans'
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(
+                    'Unsupported database vendor: {0}'.format(connection.vendor))
+
+        failures = []
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny tables are always cheaper to scan sequentially. Make
+                # the planner prove that an index can serve each query.
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                for name, qs in get_hot_querysets():
+                    plan = qs.explain()
+                    scans = [l for l in plan.splitlines()
+                                            if pattern.search(l.strip())]
+                    self.stdout.write(name)
+                    for line in plan.splitlines():
+                        self.stdout.write('    {0}'.format(line))
+                    if scans:
+                        failures.append(name)
+            finally:
+                if connection.vendor == 'postgresql':
+                    cursor.execute('RESET enable_seqscan')
+
+        if failures:
+            raise CommandError('Full table scan in: {0}'.format(
+                                                        ', '.join(failures)))
+        self.stdout.write(self.style.SUCCESS('No full table scan.'))
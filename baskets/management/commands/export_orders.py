@@ -0,0 +1,63 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from baskets.export import FORMATS, WRITERS, export_items, \
+                           get_default_format, pyarrow
+from baskets.models import CartItem, ArchivedCartItem
+
+
+class Command(BaseCommand):
+    help = ('Export all current cart items, or archived items added since '
+            'the previous export, to a new Parquet (or gzipped CSV) file')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                'directory',
+                help='Directory holding exported files and watermarks')
+        parser.add_argument(
+                '--archived', action='store_true',
+                help='Export archived items instead of current ones')
+        parser.add_argument(
+                '--format', choices=FORMATS, default=get_default_format(),
+                help='Output format (parquet requires pyarrow)')
+        parser.add_argument(
+                '--full', action='store_true',
+                help='Ignore the watermark and export all archived items')
+        parser.add_argument(
+                '--chunk-size', type=int, default=2000,
+                help='Number of items fetched and written at once')
+
+    def handle(self, *args, **options):
+        if options['format'] == 'parquet' and pyarrow is None:
+            raise CommandError('Parquet export requires pyarrow.')
+        model = ArchivedCartItem if options['archived'] else CartItem
+        name = model._meta.model_name
+        directory = options['directory']
+        os.makedirs(directory, exist_ok=True)
+
+        # Last exported id, for archived items only: current items change
+        # in place and are exported in full each time
+        incremental = options['archived'] and not options['full']
+        watermark = os.path.join(directory, name + '.watermark')
+        after_id = 0
+        if incremental and os.path.exists(watermark):
+            with open(watermark) as f:
+                after_id = int(f.read())
+
+        ext = WRITERS[options['format']].extension
+        partial = os.path.join(directory, '{0}.partial.{1}'.format(name, ext))
+        count, last_id = export_items(model, partial, options['format'],
+                                      after_id, options['chunk_size'])
+        if count and options['archived']:
+            path = os.path.join(directory, '{0}-{1:d}-{2:d}.{3}'.format(
+                                            name, after_id + 1, last_id, ext))
+            os.replace(partial, path)
+            with open(watermark, 'w') as f:
+                f.write(str(last_id))
+        elif count:
+            path = os.path.join(directory, '{0}-{1}.{2}'.format(
+                        name, now().strftime('%Y%m%dT%H%M%S%f'), ext))
+            os.replace(partial, path)
+        self.stdout.write('{0} item(s) exported.'.format(count))
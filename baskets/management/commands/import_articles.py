@@ -0,0 +1,33 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from baskets.catalogue import import_articles
+
+
+class Command(BaseCommand):
+    help = 'Create or update articles from a CSV file, matched by code'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                'file',
+                help='CSV file with code, label, unit_price and unit_type '
+                     'columns')
+        parser.add_argument(
+                '--batch-size', type=int, default=500,
+                help='Number of articles saved per statement')
+        parser.add_argument(
+                '--dry-run', action='store_true',
+                help='Report changes without saving them')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['file'], encoding='utf-8-sig', newline='') as f:
+                counts = import_articles(f, options['batch_size'],
+                                         options['dry_run'])
+        except OSError as e:
+            raise CommandError(e)
+        except ValidationError as e:
+            raise CommandError(' '.join(e.messages))
+        self.stdout.write(
+                '{created:d} created, {updated:d} updated, '
+                '{unchanged:d} unchanged.'.format(**counts))
@@ -0,0 +1,31 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from baskets.models import Delivery
+from baskets.orders import import_orders
+
+
+class Command(BaseCommand):
+    help = 'Create carts for a delivery from a CSV file of phone orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('delivery', type=int, help='Delivery id')
+        parser.add_argument(
+                'file',
+                help='CSV file with customer (username), article (code) and '
+                     'quantity columns')
+
+    def handle(self, *args, **options):
+        try:
+            delivery = Delivery.objects.get(id=options['delivery'])
+        except Delivery.DoesNotExist:
+            raise CommandError('No delivery #{0:d}.'.format(
+                                                        options['delivery']))
+        try:
+            with open(options['file'], encoding='utf-8-sig', newline='') as f:
+                carts = import_orders(delivery, f)
+        except OSError as e:
+            raise CommandError(e)
+        except ValidationError as e:
+            raise CommandError(' '.join(e.messages))
+        self.stdout.write('{0} order(s) imported.'.format(len(carts)))
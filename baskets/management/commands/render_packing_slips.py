@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from baskets.models import Delivery
+from baskets.slips import render_slips
+
+
+class Command(BaseCommand):
+    help = ('Write the packing slips of all baskets to be prepared for a '
+            'delivery as a printable HTML document')
+
+    def add_arguments(self, parser):
+        parser.add_argument('delivery', type=int, help='Delivery id')
+        parser.add_argument(
+                '--output', '-o',
+                help='Output file (standard output by default)')
+        parser.add_argument(
+                '--processes', type=int,
+                help='Number of rendering processes (PACKING_SLIP_PROCESSES '
+                     'setting by default)')
+
+    def handle(self, *args, **options):
+        try:
+            delivery = Delivery.objects.select_related('location') \
+                                       .get(id=options['delivery'])
+        except Delivery.DoesNotExist:
+            raise CommandError('No delivery #{0:d}.'.format(
+                                                        options['delivery']))
+        html = render_slips(delivery, options['processes'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(html)
+        else:
+            self.stdout.write(html)
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from baskets.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                '--batch-size', type=int, default=50,
+                help='Number of jobs claimed at once')
+        parser.add_argument(
+                '--concurrency', type=int, default=1,
+                help='Number of jobs run in parallel threads')
+        parser.add_argument(
+                '--sleep', type=float, default=1,
+                help='Seconds to wait when there is nothing to do')
+        parser.add_argument(
+                '--once', action='store_true',
+                help='Exit when no job is due instead of waiting for more')
+
+    def handle(self, *args, **options):
+        count = 0
+        try:
+            while True:
+                n = run_pending(options['batch_size'],
+                                options['concurrency'])
+                count += n
+                if n:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write('{0} job(s) run.'.format(count))
@@ -0,0 +1,44 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+
+# Engines storing sessions in the `django_session` table
+DB_ENGINES = ('django.contrib.sessions.backends.db',
+              'django.contrib.sessions.backends.cached_db')
+
+
+class Command(BaseCommand):
+    help = 'Remove expired sessions, in batches for database-backed engines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                '--batch-size', type=int, default=1000,
+                help='Number of sessions deleted per statement')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in DB_ENGINES:
+            # Other engines (cache, signed cookies...) expire on their own
+            # or know best how to clean up
+            engine = import_module(settings.SESSION_ENGINE)
+            try:
+                engine.SessionStore.clear_expired()
+            except NotImplementedError:
+                pass
+            return
+
+        # Short DELETE statements rather than one big one, so that order
+        # writes are not stuck behind the sweeper (SQLite has a single lock)
+        count = 0
+        expired = Session.objects.filter(expire_date__lt=now())
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)
+                               [:options['batch_size']])
+            if not keys:
+                break
+            Session.objects.filter(session_key__in=keys).delete()
+            count += len(keys)
+        self.stdout.write('{0} expired session(s) removed.'.format(count))
@@ -0,0 +1,21 @@
+# Generated by Django 3.0.4 on 2026-10-18 22:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('baskets', '0015_limit_cart_number_per_slot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='packer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='packed_carts', to=settings.AUTH_USER_MODEL, verbose_name='packer'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.0.4 on 2026-10-18 22:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('baskets', '0016_add_packer_to_cart'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartStatusChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.PositiveSmallIntegerField(choices=[(10, 'received'), (20, 'preparation in progress'), (30, 'prepared'), (40, 'delivered'), (50, 'abandoned')], null=True, verbose_name='previous status')),
+                ('to_status', models.PositiveSmallIntegerField(choices=[(10, 'received'), (20, 'preparation in progress'), (30, 'prepared'), (40, 'delivered'), (50, 'abandoned')], verbose_name='new status')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date')),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='baskets.Cart', verbose_name='cart')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'cart status change',
+                'verbose_name_plural': 'cart status changes',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cartstatuschange',
+            index=models.Index(fields=['cart', 'to_status'], name='baskets_car_cart_id_ed0e79_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cartstatuschange',
+            index=models.Index(fields=['user', 'to_status', 'timestamp'], name='baskets_car_user_id_228a1d_idx'),
+        ),
+    ]
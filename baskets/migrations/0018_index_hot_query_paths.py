@@ -0,0 +1,25 @@
+# Generated by Django 3.0.4 on 2026-10-18 22:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0017_log_cart_status_changes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['slot', 'status'], name='baskets_car_slot_id_2d75a0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['cart', 'label', 'unit_type'], name='baskets_car_cart_id_cba8c9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliveryslot',
+            index=models.Index(fields=['delivery', 'start'], name='baskets_del_deliver_6cd57d_idx'),
+        ),
+    ]
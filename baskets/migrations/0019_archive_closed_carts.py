@@ -0,0 +1,63 @@
+# Generated by Django 3.0.4 on 2026-10-18 22:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('baskets', '0018_index_hot_query_paths'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCart',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('status', models.PositiveSmallIntegerField(choices=[(10, 'received'), (20, 'preparation in progress'), (30, 'prepared'), (40, 'delivered'), (50, 'abandoned')], verbose_name='status')),
+                ('annotation', models.TextField(blank=True, default='', verbose_name='annotation')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='archived at')),
+                ('packer', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_packed_carts', to=settings.AUTH_USER_MODEL, verbose_name='packer')),
+                ('slot', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_carts', to='baskets.DeliverySlot', verbose_name='slot')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_carts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'archived cart',
+                'verbose_name_plural': 'archived carts',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedCartStatusChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.PositiveSmallIntegerField(choices=[(10, 'received'), (20, 'preparation in progress'), (30, 'prepared'), (40, 'delivered'), (50, 'abandoned')], null=True, verbose_name='previous status')),
+                ('to_status', models.PositiveSmallIntegerField(choices=[(10, 'received'), (20, 'preparation in progress'), (30, 'prepared'), (40, 'delivered'), (50, 'abandoned')], verbose_name='new status')),
+                ('timestamp', models.DateTimeField(verbose_name='date')),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='baskets.ArchivedCart', verbose_name='cart')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'archived cart status change',
+                'verbose_name_plural': 'archived cart status changes',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedCartItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=255)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('unit_type', models.CharField(choices=[('U', 'unit(s)'), ('W', 'Kg')], max_length=1)),
+                ('quantity', models.DecimalField(decimal_places=3, max_digits=6)),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='baskets.ArchivedCart', verbose_name='cart')),
+            ],
+            options={
+                'verbose_name': 'archived item',
+                'verbose_name_plural': 'archived items',
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 3.0.4 on 2026-10-18 22:52
+
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+from PIL import Image
+
+
+# Copy of `baskets.images.make_variants` as of this migration, so that
+# later changes of the module do not alter it
+
+PICTURE_WIDTHS = (320, 640, 1280)
+
+VARIANT_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80}),
+    ('jpg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+)
+
+
+def make_variants(field_file):
+    storage = field_file.storage
+    with field_file.open('rb') as f:
+        original = Image.open(f)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'A' in original.mode else 'RGB')
+
+    for width in (w for w in PICTURE_WIDTHS if w < original.width):
+        height = round(original.height * width / original.width)
+        resized = None
+        for ext, fmt, options in VARIANT_FORMATS:
+            root, _ = os.path.splitext(field_file.name)
+            name = '{0}_{1:d}w.{2}'.format(root, width, ext)
+            if storage.exists(name):
+                continue
+            if resized is None:
+                resized = original.resize((width, height), Image.LANCZOS)
+            img = resized
+            if fmt == 'JPEG' and img.mode != 'RGB':
+                img = img.convert('RGB')
+            buf = io.BytesIO()
+            img.save(buf, fmt, **options)
+            storage.save(name, ContentFile(buf.getvalue()))
+
+
+def store_picture_sizes(apps, schema_editor):
+    Merchant = apps.get_model('baskets', 'Merchant')
+    for merchant in Merchant.objects.exclude(picture='') \
+                                    .exclude(picture__isnull=True):
+        try:
+            # Assigning the file makes ImageField fill dimension fields
+            merchant.picture = merchant.picture.name
+            merchant.save()
+            make_variants(merchant.picture)
+        except OSError:
+            # Missing file, dimensions stay unknown
+            pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0019_archive_closed_carts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='merchant',
+            name='picture_height',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='merchant',
+            name='picture_width',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='merchant',
+            name='picture',
+            field=models.ImageField(blank=True, height_field='picture_height', null=True, upload_to='', width_field='picture_width'),
+        ),
+        migrations.RunPython(store_picture_sizes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.0.4 on 2026-10-18 22:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0021_add_version_stamps'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['label'], name='baskets_art_label_135377_idx'),
+        ),
+    ]
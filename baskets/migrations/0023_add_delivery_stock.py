@@ -0,0 +1,37 @@
+# Generated by Django 3.0.4 on 2026-10-18 22:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0022_index_article_label'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryStock',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=3, max_digits=7, verbose_name='available quantity')),
+                ('reserved', models.DecimalField(decimal_places=3, default=0, editable=False, max_digits=7, verbose_name='reserved quantity')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='baskets.Article', verbose_name='article')),
+                ('delivery', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stocks', to='baskets.Delivery', verbose_name='delivery')),
+            ],
+            options={
+                'verbose_name': 'stock',
+                'verbose_name_plural': 'stocks',
+            },
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='stock',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='baskets.DeliveryStock'),
+        ),
+        migrations.AddConstraint(
+            model_name='deliverystock',
+            constraint=models.UniqueConstraint(fields=('delivery', 'article'), name='unique_delivery_stock'),
+        ),
+    ]
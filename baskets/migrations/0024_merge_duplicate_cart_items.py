@@ -0,0 +1,43 @@
+# Generated by Django 3.0.4 on 2026-10-18 23:00
+
+from django.db import migrations, models
+
+
+def merge_duplicates(apps, schema_editor):
+    CartItem = apps.get_model('baskets', 'CartItem')
+    groups = CartItem.objects.values('cart', 'label', 'unit_type') \
+                             .annotate(n=models.Count('id'),
+                                       keep=models.Min('id'),
+                                       total=models.Sum('quantity')) \
+                             .filter(n__gt=1) \
+                             .order_by()
+    # Merged groups no longer match, so each batch is a fresh first page
+    while True:
+        batch = list(groups[:500])
+        if not batch:
+            break
+        for g in batch:
+            lines = CartItem.objects.filter(cart=g['cart'],
+                                            label=g['label'],
+                                            unit_type=g['unit_type'])
+            lines.filter(id=g['keep']).update(quantity=g['total'])
+            lines.exclude(id=g['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0023_add_delivery_stock'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cartitem',
+            name='baskets_car_cart_id_cba8c9_idx',
+        ),
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'label', 'unit_type'), name='unique_cart_article'),
+        ),
+    ]
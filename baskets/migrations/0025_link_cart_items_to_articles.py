@@ -0,0 +1,62 @@
+# Generated by Django 3.0.4 on 2026-10-18 23:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def link_items(apps, schema_editor):
+    Article = apps.get_model('baskets', 'Article')
+    articles = {}
+    for a in Article.objects.all():
+        key = (a.label, a.unit_type)
+        # Ambiguous labels are left unlinked
+        articles[key] = None if key in articles else a.id
+
+    for name in ('CartItem', 'ArchivedCartItem'):
+        Item = apps.get_model('baskets', name)
+        last_id = 0
+        while True:
+            batch = list(Item.objects.filter(id__gt=last_id,
+                                             article__isnull=True)
+                                     .order_by('id')
+                                     .values_list('id', 'label', 'unit_type')
+                                     [:1000])
+            if not batch:
+                break
+            by_article = {}
+            for id, label, unit_type in batch:
+                article_id = articles.get((label, unit_type))
+                if article_id is not None:
+                    by_article.setdefault(article_id, []).append(id)
+            for article_id, ids in by_article.items():
+                Item.objects.filter(id__in=ids).update(article_id=article_id)
+            last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0024_merge_duplicate_cart_items'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='cartitem',
+            name='unique_cart_article',
+        ),
+        migrations.AddField(
+            model_name='archivedcartitem',
+            name='article',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='baskets.Article', verbose_name='article'),
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='article',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='baskets.Article', verbose_name='article'),
+        ),
+        migrations.RunPython(link_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'article'), name='unique_cart_article'),
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 3.0.4 on 2026-10-18 23:40
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+import baskets.fields
+
+
+# (model, field, old definition, new definition)
+FIELDS = [
+    ('Article', 'unit_price',
+        models.DecimalField(max_digits=5, decimal_places=2, null=True,
+                            verbose_name='unit price'),
+        baskets.fields.FixedPointField(decimal_places=2, max_digits=5,
+                                       verbose_name='unit price')),
+    ('CartItem', 'unit_price',
+        models.DecimalField(max_digits=5, decimal_places=2, null=True),
+        baskets.fields.FixedPointField(decimal_places=2, max_digits=5)),
+    ('CartItem', 'quantity',
+        models.DecimalField(max_digits=6, decimal_places=3, null=True),
+        baskets.fields.FixedPointField(decimal_places=3, max_digits=6)),
+    ('ArchivedCartItem', 'unit_price',
+        models.DecimalField(max_digits=5, decimal_places=2, null=True),
+        baskets.fields.FixedPointField(decimal_places=2, max_digits=5)),
+    ('ArchivedCartItem', 'quantity',
+        models.DecimalField(max_digits=6, decimal_places=3, null=True),
+        baskets.fields.FixedPointField(decimal_places=3, max_digits=6)),
+    ('DeliveryStock', 'quantity',
+        models.DecimalField(max_digits=7, decimal_places=3, null=True,
+                            verbose_name='available quantity'),
+        baskets.fields.FixedPointField(decimal_places=3, max_digits=7,
+                                       verbose_name='available quantity')),
+    ('DeliveryStock', 'reserved',
+        models.DecimalField(max_digits=7, decimal_places=3, null=True,
+                            default=0, editable=False,
+                            verbose_name='reserved quantity'),
+        baskets.fields.FixedPointField(decimal_places=3, max_digits=7,
+                                       default=0, editable=False,
+                                       verbose_name='reserved quantity')),
+]
+
+
+def copy_values(apps, to_integer):
+    for model_name, name, old, new in FIELDS:
+        Model = apps.get_model('baskets', model_name)
+        src, dst = (name, name + '_int') if to_integer else (name + '_int', name)
+        last_id = 0
+        while True:
+            batch = list(Model.objects.filter(id__gt=last_id)
+                                      .order_by('id')
+                                      .only('id', src)[:1000])
+            if not batch:
+                break
+            for obj in batch:
+                value = getattr(obj, src)
+                if value is not None:
+                    if to_integer:
+                        value = int(value.scaleb(new.decimal_places)
+                                         .to_integral_value(ROUND_HALF_UP))
+                    else:
+                        value = Decimal(value).scaleb(-new.decimal_places)
+                setattr(obj, dst, value)
+            Model.objects.bulk_update(batch, [dst])
+            last_id = batch[-1].id
+
+
+def to_integers(apps, schema_editor):
+    copy_values(apps, True)
+
+
+def to_decimals(apps, schema_editor):
+    copy_values(apps, False)
+
+
+def operations():
+    add, convert, rename = [], [], []
+    for model_name, name, old, new in FIELDS:
+        model_name = model_name.lower()
+        add += [
+            migrations.AddField(
+                model_name=model_name,
+                name=name + '_int',
+                field=models.IntegerField(null=True),
+            ),
+            migrations.AlterField(
+                model_name=model_name,
+                name=name,
+                field=old,
+            ),
+        ]
+        rename += [
+            migrations.RemoveField(
+                model_name=model_name,
+                name=name,
+            ),
+            migrations.RenameField(
+                model_name=model_name,
+                old_name=name + '_int',
+                new_name=name,
+            ),
+            migrations.AlterField(
+                model_name=model_name,
+                name=name,
+                field=new,
+            ),
+        ]
+    convert.append(migrations.RunPython(to_integers, to_decimals))
+    return add + convert + rename
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0025_link_cart_items_to_articles'),
+    ]
+
+    operations = operations()
@@ -0,0 +1,41 @@
+# Generated by Django 3.0.4 on 2026-10-18 23:17
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0026_store_amounts_as_integers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='name')),
+                ('args', models.TextField(default='{}', verbose_name='arguments')),
+                ('key', models.CharField(blank=True, default='', max_length=255, verbose_name='key')),
+                ('status', models.PositiveSmallIntegerField(choices=[(10, 'pending'), (20, 'running'), (30, 'failed')], default=10, verbose_name='status')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='attempts')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='run after')),
+                ('claimed_by', models.CharField(blank=True, default='', max_length=32)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='', verbose_name='last error')),
+            ],
+            options={
+                'verbose_name': 'job',
+                'verbose_name_plural': 'jobs',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'run_after'], name='baskets_job_status_0a7cf0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['name', 'key'], name='baskets_job_name_b87c96_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.4 on 2026-10-18 23:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0027_add_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='notified_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='customer notified at'),
+        ),
+    ]
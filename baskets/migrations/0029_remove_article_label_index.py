@@ -0,0 +1,17 @@
+# Generated by Django 3.0.4 on 2026-10-18 23:31
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0028_add_cart_notified_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='article',
+            name='baskets_art_label_135377_idx',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.4 on 2026-10-18 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0029_remove_article_label_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='notification_claim',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.0.4 on 2026-10-18 23:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0030_add_cart_notification_claim'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='job',
+            name='baskets_job_name_b87c96_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 10), models.Q(_negated=True, key='')), fields=('name', 'key'), name='unique_pending_job_key'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.0.4 on 2026-10-18 23:46
+
+import json
+import os
+
+from django.db import migrations, models
+
+
+# Naming of `baskets.images` as of this migration
+PICTURE_WIDTHS = (320, 640, 1280)
+VARIANT_EXTENSIONS = ('webp', 'jpg')
+
+
+def record_picture_variants(apps, schema_editor):
+    """
+    Record variants already made for existing pictures, queue a job making
+    the others
+    """
+    Merchant = apps.get_model('baskets', 'Merchant')
+    Job = apps.get_model('baskets', 'Job')
+    for merchant in Merchant.objects.exclude(picture='') \
+                                    .exclude(picture__isnull=True):
+        storage = merchant.picture.storage
+        root, _ = os.path.splitext(merchant.picture.name)
+        names = ['{0}_{1:d}w.{2}'.format(root, w, ext)
+                 for w in PICTURE_WIDTHS
+                 if merchant.picture_width and w < merchant.picture_width
+                 for ext in VARIANT_EXTENSIONS]
+        if all(storage.exists(name) for name in names):
+            merchant.picture_variants = merchant.picture.name
+            merchant.save(update_fields=['picture_variants'])
+        elif not Job.objects.filter(name='baskets.make_picture_variants',
+                                    key=str(merchant.id),
+                                    status=10).exists():
+            Job.objects.create(name='baskets.make_picture_variants',
+                               key=str(merchant.id),
+                               args=json.dumps({'merchant_id': merchant.id}))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0031_add_unique_pending_job_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='merchant',
+            name='picture_variants',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(record_picture_variants,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.0.4 on 2026-10-18 23:50
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Copy of `baskets.search.fold` as of this migration
+def fold(text):
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed
+                   if not unicodedata.combining(c)).casefold()
+
+
+def fill_search_labels(apps, schema_editor):
+    Article = apps.get_model('baskets', 'Article')
+    articles = list(Article.objects.all())
+    for a in articles:
+        a.search_label = fold(a.label)
+    Article.objects.bulk_update(articles, ['search_label'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baskets', '0032_record_merchant_picture_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='search_label',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_search_labels, migrations.RunPython.noop),
+    ]
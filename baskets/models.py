@@ -1,10 +1,17 @@
+import datetime
+import json
 import numbers
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction, connection, IntegrityError
 from django.utils.translation import gettext_lazy as _, gettext
 from django.utils.formats import date_format
 from django.utils import timezone
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 
+from . import images
+from .fields import FixedPointField
+
 
 class CartStatus(models.IntegerChoices):
     # Customer placed an order online, not yet processed
@@ -76,7 +83,12 @@ class URLType(models.TextChoices):
 class Article(models.Model):
     code = models.PositiveSmallIntegerField(_('code'), unique=True)
     label = models.CharField(_('name'), max_length=255)
-    unit_price = models.DecimalField(_('unit price'), max_digits=5, decimal_places=2)
+    # Label in lower case and without accents (see `baskets.search.fold`),
+    # matched by searches
+    search_label = models.CharField(max_length=255, blank=True, default='',
+                                    editable=False)
+    # Stored in cents
+    unit_price = FixedPointField(_('unit price'), max_digits=5, decimal_places=2)
     unit_type = models.CharField(
             _('unit type'),
             max_length=1,
@@ -102,7 +114,16 @@ class Merchant(models.Model):
     owner = models.ForeignKey(User, on_delete=models.PROTECT,
                                                 verbose_name=_('owner'))
     presentation = models.TextField(_('presentation'), blank=True, default='')
-    picture = models.ImageField(null=True, blank=True)
+    picture = models.ImageField(null=True, blank=True,
+                                width_field='picture_width',
+                                height_field='picture_height')
+    # Filled in on upload so that pages never open the picture file
+    picture_width = models.PositiveIntegerField(null=True, editable=False)
+    picture_height = models.PositiveIntegerField(null=True, editable=False)
+    # Name of the picture resized variants were made for, so that they are
+    # only listed once they exist
+    picture_variants = models.CharField(max_length=100, blank=True,
+                                        default='', editable=False)
     # Explicit ChoiceField for things like: organic or article categories?
     #  -> the merchant can just mention it in `presentation`
     # Payment method
@@ -111,6 +132,38 @@ class Merchant(models.Model):
         verbose_name = _('merchant')
         verbose_name_plural = _('merchants')
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self.picture and not self.has_picture_variants():
+            # Resizing takes a while, not worth holding the admin page
+            Job.enqueue('baskets.make_picture_variants',
+                        key=str(self.id), merchant_id=self.id)
+
+    def has_picture_variants(self):
+        return bool(self.picture) and \
+                    self.picture_variants == self.picture.name
+
+    def get_picture_srcset(self, ext):
+        """
+        Return `srcset` attribute value listing resized variants of the
+        picture in format `ext`, then the original picture. Empty until
+        variants are made.
+        """
+        if not self.has_picture_variants() or not self.picture_width:
+            return ''
+        storage = self.picture.storage
+        srcset = [
+            (storage.url(images.get_variant_name(self.picture.name, w, ext)), w)
+            for w in images.get_variant_widths(self.picture_width)]
+        srcset.append((self.picture.url, self.picture_width))
+        return ', '.join('{0} {1:d}w'.format(*s) for s in srcset)
+
+    def get_webp_srcset(self):
+        return self.get_picture_srcset('webp')
+
+    def get_jpeg_srcset(self):
+        return self.get_picture_srcset('jpg')
+
     def __str__(self):
         return self.name
 
@@ -161,7 +214,10 @@ class Delivery(models.Model):
             _('maximum number of baskets per slot'),
             help_text=_('Set 0 for unlimited carts per slot'),
             default=0)
-    # available article quantity
+    # Available article quantities are set with DeliveryStock
+    # Version stamp of cached template fragments, updated whenever one of
+    # this delivery's carts changes
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
     class Meta:
         permissions = [('view_delivery_quantities',
@@ -184,14 +240,74 @@ class Delivery(models.Model):
         return Cart.objects.filter(status__lte=CartStatus.PREPARED,
                             slot__delivery__id=self.id)
 
+    def get_free_slot(self):
+        """
+        Return the first slot which has not reached `max_per_slot` carts, or
+        None if this delivery is full
+        """
+        if self.max_per_slot > 0:
+            return self.slots.annotate(cart_count=models.Count('carts')) \
+                             .filter(cart_count__lt=self.max_per_slot) \
+                             .order_by('start').first()
+        else:
+            # Cart limit being disabled
+            return self.slots.order_by('start').first()
+
+    @staticmethod
+    def touch_slot(slot_id):
+        """
+        Update version stamp of the delivery `slot_id` belongs to
+        """
+        Delivery.objects.filter(slots__id=slot_id) \
+                        .update(updated_at=timezone.now())
+
+    def claim_next_cart(self, packer):
+        """
+        Atomically move the next received cart of this delivery (in slot
+        order) to PREPARING and assign it to `packer`. Return the claimed
+        cart or None when there is nothing left to prepare.
+        """
+        candidates = self.get_active_carts() \
+                         .filter(status=CartStatus.RECEIVED) \
+                         .order_by('slot__start', 'id')
+        # Where the backend can, skip rows already locked by a concurrent
+        # packer instead of queueing behind them. Elsewhere the conditional
+        # UPDATE below is enough to prevent two packers from getting the
+        # same cart.
+        skip_locked = connection.features.has_select_for_update_skip_locked \
+                        and connection.features.has_select_for_update_of
+        while True:
+            with transaction.atomic():
+                qs = candidates
+                if skip_locked:
+                    qs = qs.select_for_update(skip_locked=True, of=('self',))
+                cart_id = qs.values_list('id', flat=True).first()
+                if cart_id is None:
+                    return None
+                claimed = Cart.claim(cart_id, packer)
+            if claimed:
+                return Cart.objects.get(id=cart_id)
+
     def get_needed_quantities(self):
         """
         Return a queryset of dict with article label, unit type and the
         total quantity of this article ordered by customers for this delivery
         """
+        # Group by article id. Items not linked to an article (created before
+        # items referenced articles) are grouped by label instead.
+        unlinked_label = models.Case(
+                models.When(article__isnull=True, then='label'),
+                default=models.Value(''),
+                output_field=models.CharField())
         return CartItem.objects.filter(cart__slot__delivery__id=self.id) \
-                               .values('label', 'unit_type') \
-                               .annotate(quantity=models.Sum('quantity'))
+                               .annotate(unlinked_label=unlinked_label) \
+                               .values('article', 'unlinked_label',
+                                       'unit_type') \
+                               .annotate(label=Coalesce(
+                                            models.Max('article__label'),
+                                            models.Max('label')),
+                                         quantity=models.Sum('quantity')) \
+                               .order_by('label')
 
     def __str__(self):
         ctx = {'place': self.location.name}
@@ -205,6 +321,72 @@ class Delivery(models.Model):
             return gettext('{place} (undefined time slots)').format(**ctx)
 
 
+def _quantity_value(model, quantity):
+    """
+    Wrap a Python `quantity` so that it is converted to the integer stored
+    in `model.quantity` when used in F() expressions
+    """
+    return models.Value(quantity, output_field=model._meta.get_field('quantity'))
+
+
+class DeliveryStock(models.Model):
+    """
+    Quantity of an article the merchant brings to a delivery. Articles
+    without stock are not limited.
+    """
+    delivery = models.ForeignKey(
+            Delivery,
+            on_delete=models.CASCADE,
+            related_name='stocks',
+            verbose_name=_('delivery'))
+    article = models.ForeignKey(
+            Article,
+            on_delete=models.CASCADE,
+            verbose_name=_('article'))
+    # Stored in grams or thousandths of unit
+    quantity = FixedPointField(
+            _('available quantity'),
+            max_digits=7,
+            decimal_places=3)
+    # Sum of quantities in customers' carts
+    reserved = FixedPointField(
+            _('reserved quantity'),
+            max_digits=7,
+            decimal_places=3,
+            default=0,
+            editable=False)
+
+    class Meta:
+        verbose_name = _('stock')
+        verbose_name_plural = _('stocks')
+        constraints = [models.UniqueConstraint(fields=['delivery', 'article'],
+                                               name='unique_delivery_stock')]
+
+    @staticmethod
+    def reserve(stock_id, quantity):
+        """
+        Atomically reserve `quantity` if that much is left. Return True on
+        success.
+        """
+        if quantity <= 0:
+            raise ValueError('A reserved `quantity` should be positive')
+        quantity = _quantity_value(DeliveryStock, quantity)
+        return DeliveryStock.objects.filter(
+                        id=stock_id,
+                        reserved__lte=models.F('quantity') - quantity) \
+                    .update(reserved=models.F('reserved') + quantity) == 1
+
+    @staticmethod
+    def release(stock_id, quantity):
+        quantity = _quantity_value(DeliveryStock, quantity)
+        DeliveryStock.objects.filter(id=stock_id) \
+                .update(reserved=models.F('reserved') - quantity)
+
+    def __str__(self):
+        return '{0}: {1}'.format(self.article.label,
+                    UnitType(self.article.unit_type).hr_quantity(self.quantity))
+
+
 class DeliverySlot(models.Model):
     start = models.DateTimeField(_('start at'))
     end = models.DateTimeField(_('end at'))
@@ -217,6 +399,7 @@ class DeliverySlot(models.Model):
     class Meta:
         verbose_name = _('delivery time slot')
         verbose_name_plural = _('delivery time slots')
+        indexes = [models.Index(fields=['delivery', 'start'])]
 
     def __str__(self):
         ctx = {
@@ -226,6 +409,20 @@ class DeliverySlot(models.Model):
         return '{day} ({start}-{end})'.format(**ctx)
 
 
+class CartManager(models.Manager):
+    def with_details(self):
+        """
+        Return carts along with their slot, delivery, location, user and
+        items, and the number of slots of their delivery (`slot_count`),
+        so that the cart page is rendered without further query
+        """
+        return self.get_queryset() \
+                   .select_related('user', 'slot__delivery__location') \
+                   .annotate(slot_count=models.Count('slot__delivery__slots')) \
+                   .prefetch_related(models.Prefetch(
+                            'items', queryset=CartItem.objects.order_by('id')))
+
+
 class Cart(models.Model):
     user = models.ForeignKey(
             User,
@@ -240,21 +437,214 @@ class Cart(models.Model):
             _('status'),
             choices=CartStatus.choices,
             default=CartStatus.RECEIVED)
+    packer = models.ForeignKey(
+            User,
+            on_delete=models.SET_NULL,
+            null=True,
+            blank=True,
+            verbose_name=_('packer'),
+            related_name='packed_carts')
     annotation = models.TextField(
             _('annotation'),
             blank=True,
             default='')
+    # Version stamp of cached template fragments
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+    # When the customer was told that the basket is ready, and the claim of
+    # the job notifying the customer, see baskets/notifications.py
+    notified_at = models.DateTimeField(_('customer notified at'), null=True,
+                                       blank=True, editable=False)
+    notification_claim = models.CharField(max_length=32, blank=True,
+                                          default='', editable=False)
+
+    objects = CartManager()
 
     class Meta:
         permissions = [('prepare_basket', 'Prepare basket')]
         verbose_name = _('cart')
         verbose_name_plural = _('carts')
+        indexes = [models.Index(fields=['slot', 'status'])]
 
     def get_total(self):
-        total = 0
-        for i in self.items.all():
-            total = total + i.unit_price * i.quantity
-        return total
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            # Already loaded by CartManager.with_details
+            return sum(i.price for i in self.items.all())
+        # Summed by the database, on integers
+        total = self.items.aggregate(total=models.Sum('price'))['total']
+        return total or 0
+
+    def start_preparing(self, packer):
+        """
+        Move this cart from RECEIVED to PREPARING on behalf of `packer`.
+        Return False if someone else got it first.
+        """
+        claimed = Cart.claim(self.id, packer)
+        self.refresh_from_db(fields=['status', 'packer', 'updated_at'])
+        return claimed
+
+    @staticmethod
+    def claim(cart_id, packer):
+        """
+        Conditionally move cart `cart_id` from RECEIVED to PREPARING and log
+        the transition. Return True if the cart was actually claimed.
+        """
+        with transaction.atomic():
+            claimed = Cart.objects.filter(id=cart_id,
+                                          status=CartStatus.RECEIVED) \
+                                  .update(status=CartStatus.PREPARING,
+                                          packer=packer,
+                                          updated_at=timezone.now())
+            if claimed:
+                Delivery.objects.filter(slots__carts__id=cart_id) \
+                                .update(updated_at=timezone.now())
+                CartStatusChange.objects.create(
+                                        cart_id=cart_id,
+                                        from_status=CartStatus.RECEIVED,
+                                        to_status=CartStatus.PREPARING,
+                                        user=packer)
+        return claimed == 1
+
+    def set_status(self, status, user=None):
+        """
+        Change this cart status and record the transition
+        """
+        with transaction.atomic():
+            CartStatusChange.objects.create(cart=self,
+                                            from_status=self.status,
+                                            to_status=status,
+                                            user=user)
+            self.status = status
+            self.save()
+            if status == CartStatus.ABANDONED:
+                self.release_stock()
+            elif status == CartStatus.PREPARED and self.slot_id is not None:
+                # Customers of baskets prepared within a few minutes are
+                # notified together
+                delivery_id = self.slot.delivery_id
+                Job.enqueue('baskets.notify_pickup', key=str(delivery_id),
+                            delay=settings.PICKUP_NOTIFICATION_DELAY,
+                            delivery_id=delivery_id)
+
+    def add_item(self, article, quantity):
+        """
+        Add `quantity` of `article` to this cart, reserving it from the
+        delivery stock. If the cart already holds this article, its quantity
+        is increased. Return False when not enough is left.
+        """
+        if quantity <= 0:
+            raise ValueError('An added `quantity` should be positive')
+        with transaction.atomic():
+            stock_id = DeliveryStock.objects \
+                            .filter(delivery__slots__id=self.slot_id,
+                                    article=article) \
+                            .values_list('id', flat=True).first()
+            line = CartItem.objects.filter(cart=self, article=article)
+            current = line.select_for_update().values_list('id', 'stock') \
+                          .first()
+            if current is not None and current[1] is None:
+                # Line added before the stock was set, which does not
+                # account for it: keep it that way
+                stock_id = None
+            if stock_id is not None and \
+                            not DeliveryStock.reserve(stock_id, quantity):
+                return False
+            increase = {'quantity': models.F('quantity') +
+                                    _quantity_value(CartItem, quantity)}
+            if not line.update(**increase):
+                try:
+                    with transaction.atomic():
+                        CartItem.objects.create(cart=self,
+                                                article=article,
+                                                label=article.label,
+                                                unit_price=article.unit_price,
+                                                unit_type=article.unit_type,
+                                                quantity=quantity,
+                                                stock_id=stock_id)
+                except IntegrityError:
+                    # Same line created concurrently, merge into it
+                    line.update(**increase)
+            self.touch()
+        return True
+
+    def copy_items(self, source):
+        """
+        Copy items of cart `source` into this cart, at current article
+        prices. Return labels of items which could not be copied (article
+        no longer sold or not enough left).
+        """
+        # Empty lines are left out, they cannot be reserved
+        lines = list(source.items.filter(quantity__gt=0)
+                                 .values('article', 'label', 'unit_type',
+                                         'quantity'))
+        articles = list(Article.objects.filter(
+                models.Q(id__in={l['article'] for l in lines}) |
+                models.Q(label__in={l['label'] for l in lines
+                                                    if not l['article']})))
+        by_id = {a.id: a for a in articles}
+        # Items not linked to an article are matched by label
+        by_label = {(a.label, a.unit_type): a for a in articles}
+        stocks = dict(DeliveryStock.objects.filter(
+                                    delivery__slots__id=self.slot_id,
+                                    article__in=articles)
+                                           .values_list('article_id', 'id'))
+        items = {}
+        missing = []
+        with transaction.atomic():
+            for l in lines:
+                if l['article']:
+                    a = by_id.get(l['article'])
+                else:
+                    a = by_label.get((l['label'], l['unit_type']))
+                stock_id = stocks.get(a.id) if a else None
+                if a is None or (stock_id is not None and
+                        not DeliveryStock.reserve(stock_id, l['quantity'])):
+                    missing.append(l['label'])
+                    continue
+                if a.id in items:
+                    items[a.id].quantity += l['quantity']
+                    continue
+                items[a.id] = CartItem(cart=self,
+                                       article=a,
+                                       label=a.label,
+                                       unit_price=a.unit_price,
+                                       unit_type=a.unit_type,
+                                       quantity=l['quantity'],
+                                       stock_id=stock_id)
+            CartItem.objects.bulk_create(items.values())
+            self.touch()
+        return missing
+
+    def release_stock(self):
+        """
+        Give back quantities reserved by items of this cart
+        """
+        with transaction.atomic():
+            items = self.items.filter(stock__isnull=False)
+            for i in items.values('stock').annotate(
+                                        total=models.Sum('quantity')):
+                DeliveryStock.release(i['stock'], i['total'])
+            items.update(stock=None)
+
+    def touch(self):
+        """
+        Update version stamps of this cart and its delivery, for instance
+        when its items change
+        """
+        self.updated_at = timezone.now()
+        Cart.objects.filter(id=self.id).update(updated_at=self.updated_at)
+        Delivery.touch_slot(self.slot_id)
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Delivery.touch_slot(self.slot_id)
+            # Log creation as the first transition so that time spent
+            # waiting for a packer can be measured
+            if adding:
+                CartStatusChange.objects.create(cart=self,
+                                                to_status=self.status,
+                                                user=self.user)
 
     def is_prepared(self):
         return self.status == CartStatus.PREPARED
@@ -268,10 +658,56 @@ class Cart(models.Model):
         return '{day}: {user!s} ({items} items)'.format(**ctx)
 
 
+class CartStatusChange(models.Model):
+    """
+    Append-only log of cart status transitions
+    """
+    cart = models.ForeignKey(
+            Cart,
+            on_delete=models.CASCADE,
+            related_name='status_changes',
+            verbose_name=_('cart'))
+    # Null for the transition logged when the cart is created
+    from_status = models.PositiveSmallIntegerField(
+            _('previous status'),
+            choices=CartStatus.choices,
+            null=True)
+    to_status = models.PositiveSmallIntegerField(
+            _('new status'),
+            choices=CartStatus.choices)
+    user = models.ForeignKey(
+            User,
+            on_delete=models.SET_NULL,
+            null=True,
+            verbose_name=_('user'))
+    timestamp = models.DateTimeField(_('date'), default=timezone.now)
+
+    class Meta:
+        verbose_name = _('cart status change')
+        verbose_name_plural = _('cart status changes')
+        indexes = [
+            models.Index(fields=['cart', 'to_status']),
+            models.Index(fields=['user', 'to_status', 'timestamp']),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Cart status changes cannot be modified')
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return '{0}: {1} -> {2}'.format(self.cart_id,
+                                        self.get_from_status_display(),
+                                        self.get_to_status_display())
+
+
 class CartItemManager(models.Manager):
     def get_queryset(self):
-        return super().get_queryset() \
-                      .annotate(price=models.F('unit_price') * models.F('quantity'))
+        # Product of cents by thousandths, hence 5 decimal places
+        price = models.ExpressionWrapper(
+                models.F('unit_price') * models.F('quantity'),
+                output_field=FixedPointField(decimal_places=5))
+        return super().get_queryset().annotate(price=price)
 
 
 class CartItem(models.Model):
@@ -280,20 +716,51 @@ class CartItem(models.Model):
             on_delete=models.CASCADE,
             related_name='items',
             verbose_name=_('cart'))
+    # Null for items which could not be matched with an article when this
+    # field was introduced, or whose article was deleted since
+    article = models.ForeignKey(
+            Article,
+            on_delete=models.SET_NULL,
+            null=True,
+            blank=True,
+            related_name='+',
+            verbose_name=_('article'))
     # Duplicate article label and unit_price so we can keep consitent cart
     # history even when article definition is updated
     label = models.CharField(max_length=255)
-    unit_price = models.DecimalField(max_digits=5, decimal_places=2)
+    unit_price = FixedPointField(max_digits=5, decimal_places=2)
     unit_type = models.CharField(max_length=1, choices=UnitType.choices)
-    quantity = models.DecimalField(max_digits=6, decimal_places=3)
+    quantity = FixedPointField(max_digits=6, decimal_places=3)
+    # Delivery stock this item's quantity is reserved from, if any
+    stock = models.ForeignKey(
+            DeliveryStock,
+            on_delete=models.SET_NULL,
+            null=True,
+            blank=True,
+            related_name='+')
 
     class Meta:
         verbose_name = _('item')
         verbose_name_plural = _('items')
+        # A single line per article, which also serves aggregations
+        constraints = [models.UniqueConstraint(fields=['cart', 'article'],
+                                               name='unique_cart_article')]
 
     # Manager with prices computed automatically annotated
     objects = CartItemManager()
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.cart.touch()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if self.stock_id is not None:
+                DeliveryStock.release(self.stock_id, self.quantity)
+            res = super().delete(*args, **kwargs)
+        self.cart.touch()
+        return res
+
     def hr_unit_price(self):
         return UnitType(self.unit_type).hr_price(self.unit_price)
 
@@ -302,3 +769,150 @@ class CartItem(models.Model):
 
     def __str__(self):
         return '{0}: {1}'.format(self.label, self.hr_quantity())
+
+
+class ArchivedCart(models.Model):
+    """
+    Closed cart of a past delivery, moved out of the `Cart` table
+    """
+    # Keep the original cart id so that history can be cross-referenced
+    id = models.IntegerField(primary_key=True)
+    user = models.ForeignKey(
+            User,
+            on_delete=models.PROTECT,
+            related_name='archived_carts')
+    slot = models.ForeignKey(
+            DeliverySlot,
+            on_delete=models.SET_NULL,
+            null=True,
+            verbose_name='slot',
+            related_name='archived_carts')
+    status = models.PositiveSmallIntegerField(
+            _('status'),
+            choices=CartStatus.choices)
+    packer = models.ForeignKey(
+            User,
+            on_delete=models.SET_NULL,
+            null=True,
+            verbose_name=_('packer'),
+            related_name='archived_packed_carts')
+    annotation = models.TextField(_('annotation'), blank=True, default='')
+    archived_at = models.DateTimeField(_('archived at'), default=timezone.now)
+
+    class Meta:
+        verbose_name = _('archived cart')
+        verbose_name_plural = _('archived carts')
+
+
+class ArchivedCartItem(models.Model):
+    cart = models.ForeignKey(
+            ArchivedCart,
+            on_delete=models.CASCADE,
+            related_name='items',
+            verbose_name=_('cart'))
+    article = models.ForeignKey(
+            Article,
+            on_delete=models.SET_NULL,
+            null=True,
+            related_name='+',
+            verbose_name=_('article'))
+    label = models.CharField(max_length=255)
+    unit_price = FixedPointField(max_digits=5, decimal_places=2)
+    unit_type = models.CharField(max_length=1, choices=UnitType.choices)
+    quantity = FixedPointField(max_digits=6, decimal_places=3)
+
+    class Meta:
+        verbose_name = _('archived item')
+        verbose_name_plural = _('archived items')
+
+
+class ArchivedCartStatusChange(models.Model):
+    cart = models.ForeignKey(
+            ArchivedCart,
+            on_delete=models.CASCADE,
+            related_name='status_changes',
+            verbose_name=_('cart'))
+    from_status = models.PositiveSmallIntegerField(
+            _('previous status'),
+            choices=CartStatus.choices,
+            null=True)
+    to_status = models.PositiveSmallIntegerField(
+            _('new status'),
+            choices=CartStatus.choices)
+    user = models.ForeignKey(
+            User,
+            on_delete=models.SET_NULL,
+            null=True,
+            related_name='+',
+            verbose_name=_('user'))
+    timestamp = models.DateTimeField(_('date'))
+
+    class Meta:
+        verbose_name = _('archived cart status change')
+        verbose_name_plural = _('archived cart status changes')
+
+
+class JobStatus(models.IntegerChoices):
+    PENDING = 10, _('pending')
+    RUNNING = 20, _('running')
+    FAILED = 30, _('failed')
+
+
+class Job(models.Model):
+    """
+    Work deferred out of requests, run by `manage.py run_jobs` (see
+    `baskets.jobs`). Jobs are deleted once done.
+    """
+    # Name a function was registered with in `baskets.jobs`
+    name = models.CharField(_('name'), max_length=100)
+    # JSON-encoded keyword arguments
+    args = models.TextField(_('arguments'), default='{}')
+    # Pending jobs with the same name and key are coalesced into one
+    key = models.CharField(_('key'), max_length=255, blank=True, default='')
+    status = models.PositiveSmallIntegerField(
+            _('status'),
+            choices=JobStatus.choices,
+            default=JobStatus.PENDING)
+    attempts = models.PositiveSmallIntegerField(_('attempts'), default=0)
+    run_after = models.DateTimeField(_('run after'), default=timezone.now)
+    # Token of the worker batch running this job
+    claimed_by = models.CharField(max_length=32, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(_('last error'), blank=True, default='')
+
+    class Meta:
+        verbose_name = _('job')
+        verbose_name_plural = _('jobs')
+        indexes = [models.Index(fields=['status', 'run_after'])]
+        constraints = [models.UniqueConstraint(
+                fields=['name', 'key'],
+                condition=models.Q(status=JobStatus.PENDING) &
+                          ~models.Q(key=''),
+                name='unique_pending_job_key')]
+
+    @staticmethod
+    def enqueue(name, key='', delay=0, **kwargs):
+        """
+        Queue a call of job `name` with `kwargs` (JSON-serializable), to
+        run at least `delay` seconds from now. Nothing is queued when a
+        pending job has the same name and a non-empty `key`. Return True
+        when queued.
+        """
+        if key and Job.objects.filter(name=name, key=key,
+                                      status=JobStatus.PENDING).exists():
+            return False
+        try:
+            with transaction.atomic():
+                Job.objects.create(
+                        name=name,
+                        args=json.dumps(kwargs),
+                        key=key,
+                        run_after=timezone.now() +
+                                  datetime.timedelta(seconds=delay))
+        except IntegrityError:
+            # Queued concurrently
+            return False
+        return True
+
+    def __str__(self):
+        return '{0} #{1}'.format(self.name, self.id)
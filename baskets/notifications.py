@@ -0,0 +1,83 @@
+"""
+Pickup notifications
+
+Customers are emailed when their basket is ready. Rather than talking to
+the mail server from the packer's request, `Cart.set_status` queues a job
+per delivery, delayed a little so that baskets prepared meanwhile are
+notified together. Notifications of all deliveries handled by the worker
+at once are sent over a single mail server connection.
+
+Carts are claimed with the token of the running job before messages are
+sent, and marked as notified once sent. Claims of jobs that failed or whose
+worker died are ignored, so that their customers are notified on the next
+attempt.
+"""
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import models
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from .fields import FixedPointField
+from .jobs import get_claim, get_live_claims
+from .models import Cart, CartStatus
+
+
+def _claim_carts(delivery_ids, claim):
+    """
+    Mark prepared carts of `delivery_ids` whose customer has not been
+    notified yet (nor is being notified) with `claim`, and return them with
+    their total
+    """
+    price = models.ExpressionWrapper(
+            models.F('items__unit_price') * models.F('items__quantity'),
+            output_field=FixedPointField(decimal_places=5))
+    # Conditional, so that concurrent workers do not notify twice
+    Cart.objects.filter(slot__delivery__in=delivery_ids,
+                        status=CartStatus.PREPARED,
+                        notified_at__isnull=True) \
+                .exclude(notification_claim__in=get_live_claims()) \
+                .update(notification_claim=claim)
+    return list(Cart.objects.filter(notification_claim=claim,
+                                    notified_at__isnull=True)
+                            .select_related('user', 'slot__delivery__location')
+                            .annotate(total=models.Sum(price))
+                            .order_by('id'))
+
+
+def get_message(cart, connection=None):
+    """
+    Return the notification of `cart`
+    """
+    return EmailMessage(
+            _('Your basket is ready'),
+            render_to_string('baskets/pickup_notification.txt',
+                             {'cart': cart, 'total': cart.total or 0}),
+            to=[cart.user.email],
+            connection=connection)
+
+
+def send_pickup_notifications(delivery_ids):
+    """
+    Email customers of prepared baskets of `delivery_ids` who have not been
+    notified yet. Must be run by a job. Return the number of sent messages.
+    """
+    claim = get_claim()
+    if claim is None:
+        raise RuntimeError('Pickup notifications are sent by jobs')
+    carts = _claim_carts(delivery_ids, claim)
+    # Nothing to send to customers without an address
+    sent = [c.id for c in carts if not c.user.email]
+    carts = [c for c in carts if c.user.email]
+    try:
+        if carts:
+            with get_connection() as connection:
+                for c in carts:
+                    get_message(c, connection).send()
+                    sent.append(c.id)
+    finally:
+        # Unsent carts are left to the next attempt of the job
+        Cart.objects.filter(id__in=sent) \
+                    .update(notified_at=timezone.now())
+    return len(carts)
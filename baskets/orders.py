@@ -0,0 +1,151 @@
+"""
+Import of orders taken by phone or on paper
+
+The CSV file has a header line with `customer` (username), `article` (code)
+and `quantity` columns, one line per ordered article. Lines of a customer
+make a single cart. All carts of a file are created for one delivery in a
+single transaction, with a few bulk queries, or none at all when anything
+is wrong (unknown customer or article, full delivery, stock exhausted...).
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from .catalogue import read_csv
+from .models import Article, Delivery, DeliveryStock, \
+                    Cart, CartItem, CartStatus, CartStatusChange
+
+
+COLUMNS = ('customer', 'article', 'quantity')
+
+
+def read_orders(lines):
+    """
+    Return a dict of {article code: quantity} by username, read from CSV
+    `lines`. Quantities of an article listed twice for a customer are added.
+    """
+    orders = {}
+    reader = read_csv(lines, COLUMNS)
+    for row in reader:
+        try:
+            username = row['customer'].strip()
+            code = int(row['article'])
+            quantity = Decimal(row['quantity'].strip().replace(',', '.')) \
+                              .quantize(Decimal('0.001'))
+            # Bounds of the quantity field
+            if not username or not 0 < quantity < 1000:
+                raise ValueError
+        except (ValueError, InvalidOperation, AttributeError):
+            # AttributeError: missing cell
+            raise ValidationError(
+                    _('Line {line:d}: invalid order.').format(
+                                                    line=reader.line_num),
+                    code='invalid')
+        items = orders.setdefault(username, {})
+        items[code] = items.get(code, 0) + quantity
+    return orders
+
+
+def _missing(wanted, found, msg):
+    missing = sorted(set(wanted) - set(found))
+    if missing:
+        raise ValidationError(
+                msg.format(values=', '.join(str(m) for m in missing)),
+                code='unknown')
+
+
+def assign_slots(delivery, count):
+    """
+    Return the slot ids of `count` new carts of `delivery`, filling slots in
+    chronological order up to `max_per_slot` carts (the first slot only when
+    there is no limit)
+    """
+    slots = delivery.slots.annotate(cart_count=models.Count('carts')) \
+                          .order_by('start') \
+                          .values_list('id', 'cart_count')
+    if delivery.max_per_slot == 0:
+        first = slots.first()
+        return [first[0]] * count if first else []
+    assigned = []
+    for slot_id, cart_count in slots:
+        free = max(delivery.max_per_slot - cart_count, 0)
+        assigned += [slot_id] * min(free, count - len(assigned))
+    return assigned
+
+
+def import_orders(delivery, lines):
+    """
+    Create a cart for `delivery` per customer listed in CSV `lines`. Return
+    the created carts.
+    """
+    orders = read_orders(lines)
+    users = {u.username: u for u in User.objects.filter(username__in=orders)}
+    _missing(orders, users, _('Unknown customer(s): {values:s}.'))
+    codes = {c for items in orders.values() for c in items}
+    articles = {a.code: a for a in Article.objects.filter(code__in=codes)}
+    _missing(codes, articles, _('Unknown article(s): {values:s}.'))
+
+    with transaction.atomic():
+        # Serialize imports and cart creation for this delivery
+        delivery = Delivery.objects.select_for_update().get(id=delivery.id)
+        slots = assign_slots(delivery, len(orders))
+        if len(slots) < len(orders):
+            raise ValidationError(
+                    _('Not enough free slots for {count:d} order(s).')
+                                                .format(count=len(orders)),
+                    code='full')
+
+        # Take the write lock before reading the last cart id (on SQLite,
+        # the transaction does not hold it before its first write)
+        Delivery.objects.filter(id=delivery.id) \
+                        .update(updated_at=timezone.now())
+
+        # Reserve stock, article by article
+        stocks = dict(DeliveryStock.objects
+                                   .filter(delivery=delivery,
+                                           article__in=articles.values())
+                                   .values_list('article__code', 'id'))
+        totals = {}
+        for items in orders.values():
+            for code, quantity in items.items():
+                totals[code] = totals.get(code, 0) + quantity
+        for code, stock_id in stocks.items():
+            if not DeliveryStock.reserve(stock_id, totals[code]):
+                raise ValidationError(
+                        _('Not enough "{label:s}" left for this delivery.')
+                                    .format(label=articles[code].label),
+                        code='stock')
+
+        last_id = Cart.objects.aggregate(last=models.Max('id'))['last'] or 0
+        carts = Cart.objects.bulk_create([
+                Cart(user=users[username], slot_id=slot_id)
+                            for username, slot_id in zip(orders, slots)])
+        if carts and carts[0].pk is None:
+            # Primary keys of bulk-created rows are not returned by SQLite,
+            # but its write lock guarantees new carts are the last ones
+            carts = list(Cart.objects.filter(id__gt=last_id,
+                                             user__in=users.values(),
+                                             slot__delivery=delivery)
+                                     .select_related('user')
+                                     .order_by('id'))
+            if len(carts) != len(orders):
+                raise RuntimeError('Cannot retrieve imported carts')
+        CartStatusChange.objects.bulk_create(
+                CartStatusChange(cart=c, to_status=CartStatus.RECEIVED,
+                                 user=c.user) for c in carts)
+        CartItem.objects.bulk_create(
+                CartItem(cart=c,
+                         article=articles[code],
+                         label=articles[code].label,
+                         unit_price=articles[code].unit_price,
+                         unit_type=articles[code].unit_type,
+                         quantity=quantity,
+                         stock_id=stocks.get(code))
+                for c in carts
+                for code, quantity in orders[c.user.username].items())
+    return carts
@@ -0,0 +1,203 @@
+"""
+Delivery reports: preparation throughput computed from the cart status
+transition log, revenue and cart counts computed from carts
+
+Reports read both live carts and those moved to `Archived*` tables (see
+`baskets.archive`), so that past deliveries can still be reported on.
+"""
+
+import datetime
+
+from django.core.cache import cache
+from django.db.models import Count, DurationField, ExpressionWrapper, F, \
+                             Max, Min, Q, Sum
+
+from .fields import FixedPointField
+from .models import Cart, CartStatus, CartStatusChange, DeliverySlot, \
+                    ArchivedCart, ArchivedCartStatusChange
+
+
+def _reached(status, last=False):
+    """
+    Aggregate returning the (first or last) time a cart reached `status`
+    """
+    agg = Max if last else Min
+    return agg('status_changes__timestamp',
+               filter=Q(status_changes__to_status=status))
+
+
+def _duration(start, end):
+    return ExpressionWrapper(F(end) - F(start), output_field=DurationField())
+
+
+def _median(querysets, field):
+    """
+    Median of `field` over the union of `querysets`, sorted and picked by
+    the database
+    """
+    parts = [qs.filter(**{field + '__isnull': False})
+               .order_by()
+               .values_list(field, flat=True) for qs in querysets]
+    values = parts[0].union(*parts[1:], all=True).order_by(field)
+    n = values.count()
+    if n == 0:
+        return None
+    if n % 2:
+        return values[n // 2]
+    low, high = values[n // 2 - 1:n // 2 + 1]
+    return (low + high) / 2
+
+
+def _per_hour(count, start, end):
+    if not count or start is None or end is None or end <= start:
+        return None
+    return count / ((end - start) / datetime.timedelta(hours=1))
+
+
+def get_cart_timings(delivery, model=Cart):
+    """
+    Return carts of `delivery` annotated with the time they were received,
+    prepared and delivered, and the time spent between those steps. Pass
+    `ArchivedCart` as `model` for archived carts.
+    """
+    return model.objects.filter(slot__delivery__id=delivery.id) \
+                .annotate(received_at=_reached(CartStatus.RECEIVED),
+                          prepared_at=_reached(CartStatus.PREPARED, True),
+                          delivered_at=_reached(CartStatus.DELIVERED, True)) \
+                .annotate(
+                    preparation_time=_duration('received_at', 'prepared_at'),
+                    pickup_time=_duration('prepared_at', 'delivered_at'))
+
+
+def _merge_rates(rows):
+    """
+    Add up `rows` of rates aggregated from live and archived transitions
+    """
+    rows = list(rows)
+    starts = [r['first_start'] for r in rows if r['first_start'] is not None]
+    ends = [r['last_ready'] for r in rows if r['last_ready'] is not None]
+    return {'baskets': sum(r['baskets'] for r in rows),
+            'first_start': min(starts, default=None),
+            'last_ready': max(ends, default=None)}
+
+
+def get_throughput_report(delivery):
+    """
+    Return a dict with baskets per hour and median step durations for
+    `delivery`, as a whole and for each packer
+    """
+    # Transition logs of live and archived carts, with their carts' timings
+    logs = [(Model.objects.filter(cart__slot__delivery__id=delivery.id),
+             get_cart_timings(delivery, CartModel))
+            for Model, CartModel in ((CartStatusChange, Cart),
+                                     (ArchivedCartStatusChange, ArchivedCart))]
+    rates = {
+        'baskets': Count('id', filter=Q(to_status=CartStatus.PREPARED)),
+        'first_start': Min('timestamp',
+                           filter=Q(to_status=CartStatus.PREPARING)),
+        'last_ready': Max('timestamp',
+                          filter=Q(to_status=CartStatus.PREPARED)),
+    }
+
+    total = _merge_rates(changes.aggregate(**rates) for changes, _ in logs)
+    total['per_hour'] = _per_hour(total['baskets'],
+                                  total['first_start'], total['last_ready'])
+
+    rows = {}
+    for changes, _ in logs:
+        for row in (changes.filter(user__isnull=False)
+                           # Grouped by user, names may be shared or empty
+                           .values('user', 'user__username',
+                                   'user__first_name', 'user__last_name')
+                           .annotate(**rates)
+                           .filter(baskets__gt=0)
+                           .order_by()):
+            rows.setdefault(row['user'], []).append(row)
+    packers = []
+    for user_rows in rows.values():
+        p = dict(user_rows[0], **_merge_rates(user_rows))
+        p['per_hour'] = _per_hour(p['baskets'],
+                                  p['first_start'], p['last_ready'])
+        # Carts this packer marked as prepared
+        prepared = [timings.filter(id__in=changes.filter(
+                                            user=p['user'],
+                                            to_status=CartStatus.PREPARED)
+                                                 .values('cart'))
+                    for changes, timings in logs]
+        p['median_preparation_time'] = _median(prepared, 'preparation_time')
+        p['median_pickup_time'] = _median(prepared, 'pickup_time')
+        packers.append(p)
+    packers.sort(key=lambda p: (-p['baskets'], p['user']))
+
+    timings = [timings for _, timings in logs]
+    total['median_preparation_time'] = _median(timings, 'preparation_time')
+    total['median_pickup_time'] = _median(timings, 'pickup_time')
+
+    return {'delivery': total, 'packers': packers}
+
+
+def _summarize(rows):
+    """
+    Add revenue-related totals to `rows` of cart counts and revenue
+    """
+    summary = {'revenue': 0, 'carts': 0}
+    for status in CartStatus:
+        summary[status.name.lower()] = 0
+    for row in rows:
+        row['revenue'] = row['revenue'] or 0
+        row['carts'] = sum(row[status.name.lower()] for status in CartStatus)
+        sold = row['carts'] - row['abandoned']
+        row['average_basket'] = row['revenue'] / sold if sold else None
+        for key in summary:
+            summary[key] += row[key]
+    sold = summary['carts'] - summary['abandoned']
+    summary['average_basket'] = summary['revenue'] / sold if sold else None
+    return summary
+
+
+def _get_slot_figures(delivery, carts):
+    """
+    Return revenue and cart counts per status of each slot of `delivery`,
+    from the `carts` relation of slots (live or archived carts)
+    """
+    price = ExpressionWrapper(
+            F(carts + '__items__unit_price') * F(carts + '__items__quantity'),
+            output_field=FixedPointField(decimal_places=5))
+    # Items multiply joined cart rows, hence distinct counts
+    counts = {status.name.lower(): Count(carts, distinct=True,
+                                         filter=Q(**{carts + '__status':
+                                                                    status}))
+                                                for status in CartStatus}
+    return DeliverySlot.objects.filter(delivery__id=delivery.id) \
+                    .values('id', 'start', 'end') \
+                    .annotate(revenue=Sum(price, filter=~Q(**{
+                                carts + '__status': CartStatus.ABANDONED})),
+                              **counts) \
+                    .order_by('start', 'id')
+
+
+def get_delivery_summary(delivery):
+    """
+    Return a dict with revenue, cart count per status and average basket
+    value of `delivery`, as a whole and for each slot. Abandoned carts do not
+    count in revenue.
+
+    Figures come from one aggregate query on live carts and one on archived
+    carts, and are cached until the delivery version stamp changes.
+    """
+    key = 'delivery-summary:{0:d}:{1}'.format(delivery.id,
+                                              delivery.updated_at.isoformat())
+    summary = cache.get(key)
+    if summary is not None:
+        return summary
+
+    slots = list(_get_slot_figures(delivery, 'carts'))
+    for slot, archived in zip(slots,
+                              _get_slot_figures(delivery, 'archived_carts')):
+        for field in ['revenue'] + [s.name.lower() for s in CartStatus]:
+            if archived[field]:
+                slot[field] = (slot[field] or 0) + archived[field]
+
+    summary = {'delivery': _summarize(slots), 'slots': slots}
+    cache.set(key, summary)
+    return summary
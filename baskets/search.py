@@ -0,0 +1,136 @@
+"""
+Article search by code prefix or label substring
+
+Searches are served from an in-memory index of the catalogue, held by each
+worker process. It is dropped whenever an article is saved or deleted in
+this process and rebuilt after `ARTICLE_INDEX_TIMEOUT` seconds anyway, so
+that changes made by other processes show up too. When
+`ARTICLE_INDEX_TIMEOUT` is 0, the database is queried instead, with the
+same results (codes by prefix, then labels by substring).
+
+Labels are matched once folded (see `fold`), from `Article.search_label` on
+the database, since case-insensitive LIKE only folds ASCII letters on
+SQLite. Substring matches cannot use an index, the database fallback scans
+the catalogue.
+"""
+
+import bisect
+import re
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Article
+
+
+# Codes are small positive integers (up to 5 digits), written without
+# leading zeros
+CODE_PREFIX = re.compile(r'[1-9][0-9]{0,4}')
+
+
+def is_code_prefix(q):
+    return CODE_PREFIX.fullmatch(q) is not None
+
+
+def fold(text):
+    """
+    Return `text` in lower case and without accents, for matching
+    """
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed
+                   if not unicodedata.combining(c)).casefold()
+
+
+class ArticleIndex:
+    def __init__(self, articles):
+        # (code as string, article) sorted for prefix lookup with bisect
+        self.codes = sorted(((str(a.code), a) for a in articles),
+                            key=lambda c: c[0])
+        # Same order as the database fallback
+        self.labels = [(fold(a.label), a)
+                            for a in sorted(articles, key=lambda a: a.label)]
+
+    def search(self, q, limit):
+        results = []
+        if is_code_prefix(q):
+            i = bisect.bisect_left(self.codes, (q,))
+            while i < len(self.codes) and self.codes[i][0].startswith(q):
+                results.append(self.codes[i][1])
+                i += 1
+            # By code, as the database fallback
+            results = sorted(results, key=lambda a: a.code)[:limit]
+        q = fold(q)
+        for label, a in self.labels:
+            if len(results) >= limit:
+                break
+            if q in label and a not in results:
+                results.append(a)
+        return results
+
+
+_index = None
+_index_built_at = 0
+_lock = threading.Lock()
+
+
+def get_index():
+    global _index, _index_built_at
+    with _lock:
+        if _index is None or \
+                time.monotonic() - _index_built_at > settings.ARTICLE_INDEX_TIMEOUT:
+            _index = ArticleIndex(list(Article.objects.all()))
+            _index_built_at = time.monotonic()
+        return _index
+
+
+@receiver(pre_save, sender=Article)
+def set_search_label(instance, **kwargs):
+    instance.search_label = fold(instance.label)
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def drop_index(**kwargs):
+    global _index
+    with _lock:
+        _index = None
+
+
+def get_code_prefix_filter(q):
+    """
+    Filter on codes starting with digits `q` (see `is_code_prefix`), as
+    index-friendly ranges
+    """
+    n = int(q)
+    f = Q(code=n)
+    for digits in range(1, 6 - len(q)):
+        low = n * 10 ** digits
+        f |= Q(code__gte=low, code__lt=low + 10 ** digits)
+    return f
+
+
+def search_articles(q, limit=10):
+    """
+    Return up to `limit` articles whose code starts with `q` or whose label
+    contains `q` (case-insensitive), codes first
+    """
+    q = q.strip()
+    if not q:
+        return []
+    if settings.ARTICLE_INDEX_TIMEOUT:
+        return get_index().search(q, limit)
+
+    results = []
+    if is_code_prefix(q):
+        results = list(Article.objects.filter(get_code_prefix_filter(q))
+                                      .order_by('code')[:limit])
+    # The catalogue is small enough for a scan of labels
+    results += Article.objects.filter(search_label__contains=fold(q)) \
+                              .exclude(id__in=[a.id for a in results]) \
+                              .order_by('label')[:limit - len(results)]
+    return results
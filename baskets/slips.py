@@ -0,0 +1,96 @@
+"""
+Printable packing slips
+
+Slips of all active carts of a delivery are loaded with two queries, then
+rendered and joined into a single HTML document, printed (or saved as PDF)
+from the browser. `manage.py render_packing_slips` renders them in a pool
+of processes (template rendering is CPU-bound and does not touch the
+database), web requests serially.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils import translation
+
+from .models import Cart, CartItem, CartStatus, UnitType
+
+
+# Below that many slips, starting processes costs more than it saves
+POOL_THRESHOLD = 50
+
+
+def load_slips(delivery):
+    """
+    Return the data (plain dicts) of the packing slips of `delivery`, by
+    pick-up time and customer
+    """
+    carts = list(Cart.objects.filter(slot__delivery__id=delivery.id,
+                                     status__lte=CartStatus.PREPARED)
+                             .select_related('user', 'slot')
+                             .order_by('slot__start', 'user__last_name',
+                                       'user__first_name', 'id'))
+    items = {}
+    for i in CartItem.objects.filter(cart__in=[c.id for c in carts]) \
+                             .values('cart_id', 'label', 'unit_type',
+                                     'quantity', 'price') \
+                             .order_by('label'):
+        items.setdefault(i['cart_id'], []).append(i)
+    return [{'id': c.id,
+             'customer': c.user.get_full_name() or c.user.username,
+             'start': c.slot.start,
+             'end': c.slot.end,
+             'annotation': c.annotation,
+             'items': items.get(c.id, []),
+             'total': sum(i['price'] for i in items.get(c.id, []))}
+            for c in carts]
+
+
+def render_slip(slip, language=None):
+    """
+    Return the HTML of `slip`, as returned by `load_slips`
+    """
+    with translation.override(language):
+        for i in slip['items']:
+            i['hr_quantity'] = UnitType(i['unit_type']) \
+                                    .hr_quantity(i['quantity'])
+        return render_to_string('baskets/packing_slip.html', {'slip': slip})
+
+
+def _render_chunk(slips, language):
+    return [render_slip(s, language) for s in slips]
+
+
+def _init_worker():
+    # Needed when processes are spawned rather than forked
+    django.setup()
+
+
+def render_slips(delivery, processes=None):
+    """
+    Return the HTML document of the packing slips of `delivery`, rendered in
+    up to `processes` processes (`PACKING_SLIP_PROCESSES` by default, no
+    more than one per CPU)
+    """
+    slips = load_slips(delivery)
+    language = translation.get_language()
+    if processes is None:
+        processes = settings.PACKING_SLIP_PROCESSES
+    processes = min(processes, os.cpu_count() or 1)
+    if processes <= 1 or len(slips) < POOL_THRESHOLD:
+        pages = _render_chunk(slips, language)
+    else:
+        # One chunk per process: rendering a slip is quick, pickling and
+        # messaging are not negligible
+        size = -(-len(slips) // processes)
+        chunks = [slips[i:i + size] for i in range(0, len(slips), size)]
+        with ProcessPoolExecutor(max_workers=len(chunks),
+                                 initializer=_init_worker) as executor:
+            pages = [page for chunk in executor.map(_render_chunk, chunks,
+                                                    [language] * len(chunks))
+                          for page in chunk]
+    return render_to_string('baskets/packing_slips.html',
+                            {'delivery': delivery, 'slips': pages})
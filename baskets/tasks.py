@@ -0,0 +1,24 @@
+"""
+Job functions run by `manage.py run_jobs` (see `baskets.jobs`)
+"""
+
+from . import images, notifications
+from .jobs import register
+from .models import Merchant
+
+
+@register('baskets.make_picture_variants')
+def make_picture_variants(merchant_id):
+    merchant = Merchant.objects.filter(id=merchant_id).first()
+    if merchant is not None and merchant.picture:
+        images.make_variants(merchant.picture)
+        # Unless the picture was replaced meanwhile
+        Merchant.objects.filter(id=merchant_id,
+                                picture=merchant.picture.name) \
+                        .update(picture_variants=merchant.picture.name)
+
+
+@register('baskets.notify_pickup', batch=True)
+def notify_pickup(kwargs_list):
+    notifications.send_pickup_notifications(
+            {kwargs['delivery_id'] for kwargs in kwargs_list})
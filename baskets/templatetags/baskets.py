@@ -3,6 +3,7 @@ from django import template
 from django.utils.html import conditional_escape
 from django.utils.safestring import mark_safe
 from ..models import UnitType
+from .. import forecast
 
 
 register = template.Library()
@@ -36,3 +37,9 @@ def price(p, unit_type, autoescape=True):
 def quantity(q, unit_type, autoescape=True):
     """ Human-readable quantity with pluralized and localised unit """
     return unit_type.hr_quantity(q)
+
+
+@register.simple_tag
+def needed_quantities(delivery):
+    """ Quantities ordered for `delivery`, along with forecasts """
+    return forecast.get_needed_quantities(delivery)
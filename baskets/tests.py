@@ -1,18 +1,49 @@
+import csv
 import datetime
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from PIL import Image
 from decimal import Decimal
 from functools import reduce
 
-from django.test import TestCase
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import mail
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.conf import settings
+from django.core.cache import cache
 from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
 from django.utils import timezone
 
-from .models import Delivery, DeliveryLocation, DeliverySlot, \
+from .models import Article, Merchant, \
+                    Delivery, DeliveryLocation, DeliverySlot, DeliveryStock, \
                     UnitType, \
-                    CartItem, Cart, CartStatus
+                    CartItem, Cart, CartStatus, CartStatusChange, \
+                    ArchivedCart, Job, JobStatus
 from .forms import CartItemForm, AnnotationForm, SlotSelect, SlotForm
-from .admin import DeliverySlotForm
+from .admin import DeliverySlotForm, DeliveryAdmin
+from .reports import get_throughput_report, get_delivery_summary
+from .archive import archive_carts
+from .search import search_articles
+from .catalogue import import_articles
+from .orders import import_orders
+from . import forecast, jobs, slips
+from .jobs import run_pending
+from marketbasket.admission import admission_control
+from marketbasket.db import PIN_COOKIE, ReplicaPinningMiddleware, \
+                           ReplicaRouter, use_replica
 
 
 class BasketTestCase(TestCase):
@@ -190,6 +221,395 @@ class SlotFormTests(BasketTestCase):
         self.assertFalse(DeliverySlotForm(data, instance=s).is_valid())
 
 
+class ArticleSearchTests(TestCase):
+    """
+    Test case for article search, from memory or from database
+    """
+    fixtures = ['articles.json']
+
+    def setUp(self):
+        Article.objects.create(code=999, label='Épinards', unit_price=4)
+
+    def check_search(self):
+        self.assertEqual([a.code for a in search_articles('1')][:3],
+                         [1, 10, 13])
+        self.assertEqual([a.code for a in search_articles('1', limit=2)],
+                         [1, 10])
+        self.assertIn(1, [a.code for a in search_articles('mesc')])
+        self.assertIn(1, [a.code for a in search_articles('CLUN')])
+        self.assertEqual(search_articles('  '), [])
+        # Not code prefixes
+        self.assertEqual(search_articles('01'), [])
+        self.assertEqual(search_articles('²'), [])
+        # Accents and case are ignored the same way on both paths
+        for q in ('epin', 'ÉPIN', 'Épinards'):
+            self.assertEqual([a.code for a in search_articles(q)], [999])
+        self.assertEqual([a.code for a in search_articles('NARDS')], [999])
+
+    def test_search_articles(self):
+        self.check_search()
+        # Index is dropped when an article changes
+        a = Article.objects.get(code=1)
+        a.label = 'Zucchini'
+        a.save()
+        self.assertEqual([a.code for a in search_articles('zucc')], [1])
+
+    def test_search_articles_from_database(self):
+        with self.settings(ARTICLE_INDEX_TIMEOUT=0):
+            self.check_search()
+
+
+class JobTests(TestCase):
+    """
+    Test case for background jobs
+    """
+
+    def setUp(self):
+        self.calls = []
+        registry = dict(jobs._registry)
+        self.addCleanup(jobs._registry.update, registry)
+        self.addCleanup(jobs._registry.clear)
+
+        @jobs.register('test.single')
+        def single(value):
+            if value < 0:
+                raise ValueError(value)
+            self.calls.append(value)
+
+        @jobs.register('test.batch', batch=True)
+        def batch(kwargs_list):
+            self.calls.append(sorted(k['value'] for k in kwargs_list))
+
+    def test_run_pending(self):
+        for value in (1, 2):
+            Job.enqueue('test.single', value=value)
+            Job.enqueue('test.batch', value=value)
+        self.assertEqual(run_pending(batch_size=3), 3)
+        self.assertEqual(self.calls, [1, 2, [1]])
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(self.calls[-1], [2])
+        self.assertFalse(Job.objects.exists())
+        # Coalesced with the pending job, even when queued concurrently
+        self.assertTrue(Job.enqueue('test.batch', key='k', value=3))
+        self.assertFalse(Job.enqueue('test.batch', key='k', value=3))
+        with unittest.mock.patch('django.db.models.QuerySet.exists',
+                                 return_value=False):
+            self.assertFalse(Job.enqueue('test.batch', key='k', value=3))
+        self.assertEqual(Job.objects.filter(key='k').count(), 1)
+        # Not due yet
+        Job.enqueue('test.single', delay=60, value=4)
+        self.assertEqual(run_pending(), 1)
+
+    @override_settings(JOBS_MAX_ATTEMPTS=2, JOBS_RETRY_DELAY=0)
+    def test_retries(self):
+        Job.enqueue('test.single', value=-1)
+        Job.enqueue('test.unknown')
+        run_pending()
+        self.assertEqual(
+                list(Job.objects.values_list('status', 'attempts')),
+                [(JobStatus.PENDING, 1)] * 2)
+        with self.assertLogs('baskets.jobs', 'ERROR'):
+            run_pending()
+        self.assertEqual(
+                list(Job.objects.values_list('status', 'attempts')),
+                [(JobStatus.FAILED, 2)] * 2)
+        self.assertIn('ValueError', Job.objects.first().error)
+        self.assertEqual(run_pending(), 0)
+        # A failed job is dropped when the same work was queued meanwhile
+        Job.objects.all().delete()
+        Job.enqueue('test.single', key='k', value=-1)
+        job = jobs.claim(1)[0]
+        Job.enqueue('test.single', key='k', value=-1)
+        jobs._run([job])
+        self.assertFalse(Job.objects.filter(id=job.id).exists())
+        self.assertEqual(Job.objects.get().attempts, 0)
+
+    @override_settings(JOBS_MAX_ATTEMPTS=2, JOBS_TIMEOUT=60)
+    def test_timeouts(self):
+        Job.enqueue('test.single', value=1)
+        late = timezone.now() - datetime.timedelta(seconds=120)
+        # Worker died while running the job, which is claimed again
+        job = jobs.claim(1)[0]
+        Job.objects.filter(id=job.id).update(claimed_at=late)
+        job = jobs.claim(1)[0]
+        self.assertEqual((job.status, job.attempts), (JobStatus.RUNNING, 1))
+        # Until it failed too many times
+        Job.objects.filter(id=job.id).update(claimed_at=late)
+        with self.assertLogs('baskets.jobs', 'ERROR'):
+            self.assertEqual(jobs.claim(1), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (JobStatus.FAILED, 2))
+        self.assertEqual(self.calls, [])
+
+    def test_thread_errors(self):
+        for value in (1, 2):
+            Job.enqueue('test.single', value=value)
+        with unittest.mock.patch.object(jobs, '_done',
+                                        side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                run_pending(concurrency=2)
+
+    def test_command(self):
+        Job.enqueue('test.single', value=1)
+        out = io.StringIO()
+        call_command('run_jobs', once=True, concurrency=2, stdout=out)
+        self.assertEqual(self.calls, [1])
+        self.assertIn('1 job(s) run.', out.getvalue())
+
+
+@override_settings(PICKUP_NOTIFICATION_DELAY=0)
+class NotificationTests(BasketTestCase):
+    """
+    Test case for pickup notifications
+    """
+
+    def setUp(self):
+        self.install_user('francine')
+        self.install_user('reda')
+        self.install_delivery()
+        self.install_slots(3, 7, 120, 1)
+        self.article = Article.objects.create(code=1, label='Leek',
+                                              unit_price=Decimal('1.5'),
+                                              unit_type=UnitType.UNIT)
+        User.objects.filter(username='reda').update(email='')
+
+    def prepare(self, user):
+        cart = Cart.objects.create(user=user, slot=self.slot1)
+        cart.add_item(self.article, 2)
+        cart.set_status(CartStatus.PREPARED)
+        return cart
+
+    def test_send_pickup_notifications(self):
+        self.prepare(self.francine)
+        self.prepare(self.reda)
+        # A single job per delivery
+        self.assertEqual(Job.objects.count(), 1)
+        run_pending()
+        # Reda has no email address
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['francine@test.com'])
+        self.assertIn('Somewhere', mail.outbox[0].body)
+        self.assertIn('3.00', mail.outbox[0].body)
+        self.assertFalse(Cart.objects.filter(notified_at=None).exists())
+        # Customers are notified once
+        self.prepare(self.francine)
+        run_pending()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_RETRY_DELAY=0)
+    def test_failures(self):
+        User.objects.filter(username='reda').update(email='reda@test.com')
+        first = self.prepare(self.francine)
+        # Claimed by a job whose worker died
+        Cart.objects.filter(id=first.id).update(notification_claim='x' * 32)
+        self.prepare(self.reda)
+        send = mail.EmailMessage.send
+
+        def send_once(message, *args, **kwargs):
+            if mail.outbox:
+                raise OSError('Connection lost')
+            return send(message, *args, **kwargs)
+        with unittest.mock.patch.object(mail.EmailMessage, 'send',
+                                        send_once):
+            run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        # Only the customer who did not get the message is notified again
+        run_pending()
+        self.assertEqual([m.to for m in mail.outbox],
+                         [['francine@test.com'], ['reda@test.com']])
+        self.assertFalse(Job.objects.exists())
+
+
+class SlipTests(BasketTestCase):
+    """
+    Test case for packing slips
+    """
+
+    def setUp(self):
+        self.install_user('francine')
+        self.install_user('reda')
+        self.install_delivery()
+        self.install_slots(3, 7, 120, 2)
+        a = Article.objects.create(code=1, label='Leek',
+                                   unit_price=Decimal('1.5'),
+                                   unit_type=UnitType.UNIT)
+        for user, slot in ((self.reda, self.slot2),
+                           (self.francine, self.slot1)):
+            c = Cart.objects.create(user=user, slot=slot)
+            c.add_item(a, 2)
+        c.set_status(CartStatus.DELIVERED)
+
+    def test_render_slips(self):
+        Cart.objects.create(user=self.francine, slot=self.slot1)
+        with self.assertNumQueries(2):
+            html = slips.render_slips(self.delivery, processes=1)
+        self.assertEqual(html.count('class="slip"'), 2)
+        # By pick-up time
+        self.assertLess(html.index('Francine'), html.index('Reda'))
+        self.assertIn('3.00€', html)
+        # Same document from a pool of processes
+        with unittest.mock.patch.object(slips, 'POOL_THRESHOLD', 0), \
+             unittest.mock.patch('os.cpu_count', return_value=2):
+            self.assertEqual(slips.render_slips(self.delivery, processes=2),
+                             html)
+
+    def test_view(self):
+        path = reverse('packing_slips', args=[self.delivery.id])
+        self.client.login(username='francine', password='francine')
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 302)
+        self.client.login(username='jerome', password='jerome')
+        response = self.client.get(path)
+        self.assertContains(response, 'class="slip"', count=1)
+        out = io.StringIO()
+        call_command('render_packing_slips', self.delivery.id, stdout=out)
+        self.assertIn('Reda', out.getvalue())
+
+
+class CatalogueTests(BasketTestCase):
+    """
+    Test case for article import from CSV
+    """
+    fixtures = ['users.json', 'articles.json']
+
+    csv = ('code;label;unit_price;unit_type\n'
+           '1;Mesclun;10.00;W\n'
+           '2;Mesclun (500g);4,50;U\n'
+           '99;Blettes;3;w\n')
+
+    def test_import_articles(self):
+        self.assertEqual(search_articles('blet'), [])
+        with self.assertNumQueries(5):
+            counts = import_articles(io.StringIO(self.csv))
+        self.assertEqual(counts, {'created': 1, 'updated': 1,
+                                  'unchanged': 1})
+        self.assertEqual(Article.objects.get(code=2).unit_price,
+                         Decimal('4.50'))
+        self.assertEqual(Article.objects.get(code=99).unit_type,
+                         UnitType.WEIGHT)
+        # Search index is dropped
+        self.assertEqual([a.code for a in search_articles('blet')], [99])
+        # Invalid rows abort the import
+        with self.assertRaises(ValidationError):
+            import_articles(io.StringIO('code,label,unit_price,unit_type\n'
+                                        '3,Doucette,1,X\n'))
+        with self.assertRaises(ValidationError):
+            import_articles(io.StringIO('code,label\n3,Doucette\n'))
+
+    def test_admin_import(self):
+        self.install_user('jerome')
+        self.jerome.is_staff = True
+        self.jerome.save()
+        self.client.login(username='jerome', password='jerome')
+        path = reverse('admin:baskets_article_import')
+        self.assertEqual(self.client.get(path).status_code, 200)
+        f = SimpleUploadedFile('articles.csv', self.csv.encode())
+        response = self.client.post(path, {'file': f})
+        self.assertRedirects(response,
+                             reverse('admin:baskets_article_changelist'))
+        self.assertTrue(Article.objects.filter(code=99).exists())
+
+
+class OrderImportTests(BasketTestCase):
+    """
+    Test case for phone order import
+    """
+    fixtures = ['users.json', 'articles.json']
+
+    csv = ('customer,article,quantity\n'
+           'jerome,1,0.5\n'
+           'reda,2,1\n'
+           'jerome,1,0.25\n'
+           'jerome,3,1\n')
+
+    def setUp(self):
+        self.install_user('francine')
+        self.install_delivery()
+        self.install_slots(3, 7, 60, 3)
+        self.delivery.max_per_slot = 1
+        self.delivery.save()
+        Cart(user=self.francine, slot=self.slot1).save()
+
+    def test_import_orders(self):
+        stock = DeliveryStock.objects.create(
+                        delivery=self.delivery,
+                        article=Article.objects.get(code=1), quantity=1)
+        carts = import_orders(self.delivery, io.StringIO(self.csv))
+        # Slots are filled in order, up to max_per_slot
+        self.assertEqual([(c.user.username, c.slot_id) for c in carts],
+                         [('jerome', self.slot2.id), ('reda', self.slot3.id)])
+        jerome = carts[0]
+        self.assertEqual(
+                sorted(jerome.items.values_list('label', 'quantity')),
+                [('Doucette', 1), ('Mesclun', Decimal('0.75'))])
+        self.assertEqual(jerome.status_changes.get().to_status,
+                         CartStatus.RECEIVED)
+        stock.refresh_from_db()
+        self.assertEqual(stock.reserved, Decimal('0.75'))
+        # Nothing is imported when the delivery is full
+        with self.assertRaises(ValidationError):
+            import_orders(self.delivery, io.StringIO(self.csv))
+        self.assertEqual(Cart.objects.count(), 3)
+
+    def test_import_orders_out_of_stock(self):
+        DeliveryStock.objects.create(delivery=self.delivery,
+                                     article=Article.objects.get(code=1),
+                                     quantity=Decimal('0.5'))
+        with self.assertRaises(ValidationError):
+            import_orders(self.delivery, io.StringIO(self.csv))
+        self.assertEqual(Cart.objects.count(), 1)
+        self.assertEqual(DeliveryStock.objects.get().reserved, 0)
+
+    def test_import_orders_unknown_customer(self):
+        with self.assertRaisesMessage(ValidationError, 'nobody'):
+            import_orders(self.delivery,
+                          io.StringIO('customer;article;quantity\n'
+                                      'nobody;1;1\n'))
+
+
+class MerchantTests(BasketTestCase):
+    """
+    Test case for Merchant model.
+    """
+
+    def setUp(self):
+        self.install_user('jerome')
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = self.settings(MEDIA_ROOT=tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_picture(self):
+        buf = io.BytesIO()
+        Image.new('RGB', (800, 400)).save(buf, 'JPEG')
+        m = Merchant(name='Someone', owner=self.jerome)
+        m.picture = SimpleUploadedFile('pic.jpg', buf.getvalue())
+        m.save()
+        # Saving twice before variants are made queues a single job
+        m.save()
+        self.assertEqual(Job.objects.count(), 1)
+        # Dimensions are stored on upload and variants are made by a job,
+        # which they are not listed before
+        m = Merchant.objects.get(id=m.id)
+        self.assertEqual((m.picture_width, m.picture_height), (800, 400))
+        self.assertEqual(m.get_webp_srcset(), '')
+        storage = m.picture.storage
+        self.assertFalse(storage.exists('pic_640w.webp'))
+        self.assertEqual(run_pending(), 1)
+        self.assertTrue(storage.exists('pic_640w.webp'))
+        with storage.open('pic_640w.jpg') as f:
+            self.assertEqual(Image.open(f).size, (640, 320))
+        m = Merchant.objects.get(id=m.id)
+        srcset = m.get_webp_srcset().split(', ')
+        self.assertEqual(len(srcset), 3)  # 320w, 640w and the original
+        self.assertTrue(srcset[0].endswith('_320w.webp 320w'))
+        # Saving again does not make them twice
+        m.save()
+        self.assertFalse(Job.objects.exists())
+
+
 class DeliveryTests(BasketTestCase):
     """
     Test case for Delivery model.
@@ -244,6 +664,33 @@ class DeliveryTests(BasketTestCase):
         CartItem(**kwargs).save()
         qs5 = self.delivery.get_needed_quantities()
         self.assertEqual(qs5.count(), 2)
+        # Items of a renamed article are counted together, under its
+        # current label
+        a = Article(code=1, label='zzz', unit_price=1, unit_type=UnitType.UNIT)
+        a.save()
+        c1.add_item(a, 1)
+        a.label = 'ZZZ'
+        a.save()
+        c2.add_item(a, 2)
+        qs6 = self.delivery.get_needed_quantities()
+        self.assertEqual(qs6.count(), 3)
+        self.assertEqual(qs6.get(article=a.id)['label'], 'ZZZ')
+        self.assertEqual(qs6.get(article=a.id)['quantity'], 3)
+
+    def test_claim_next_cart(self):
+        self.install_slots(3, 7, 60, 2)
+        c2 = Cart(user=self.francine, slot=self.slot2)
+        c2.save()
+        c1 = Cart(user=self.francine, slot=self.slot1)
+        c1.save()
+        # Carts are claimed in slot order, each one only once
+        self.assertEqual(self.delivery.claim_next_cart(self.reda), c1)
+        claimed = self.delivery.claim_next_cart(self.reda)
+        self.assertEqual(claimed, c2)
+        self.assertEqual(claimed.status, CartStatus.PREPARING)
+        self.assertEqual(claimed.packer, self.reda)
+        self.assertIsNone(self.delivery.claim_next_cart(self.reda))
+
 
 class CartTests(BasketTestCase):
     """
@@ -260,11 +707,33 @@ class CartTests(BasketTestCase):
     def test_get_total(self):
         """ Ensure get_total return the total price for this basket """
         self.assertEqual(self.cart.get_total(), 0)
-        CartItem(cart=self.cart, unit_price=2, quantity=2).save()
+        CartItem(cart=self.cart, label='x', unit_price=2, quantity=2).save()
         self.assertEqual(self.cart.get_total(), 4)
-        CartItem(cart=self.cart, unit_price=2.5, quantity=0.500).save()
+        CartItem(cart=self.cart, label='y', unit_price=2.5,
+                 quantity=0.500).save()
         self.assertEqual(self.cart.get_total(), 5.25)
 
+    def test_integer_storage(self):
+        """ Prices are stored in cents and quantities in thousandths """
+        CartItem(cart=self.cart, label='x', unit_price=Decimal('1.99'),
+                 quantity=Decimal('0.125')).save()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT unit_price, quantity FROM baskets_cartitem')
+            self.assertEqual(cursor.fetchone(), (199, 125))
+        item = CartItem.objects.get()
+        self.assertEqual(item.unit_price, Decimal('1.99'))
+        self.assertEqual(item.quantity, Decimal('0.125'))
+        self.assertEqual(item.price, Decimal('0.24875'))
+
+    def test_add_item(self):
+        """ Adding an article twice makes a single line """
+        a = Article(code=1, label='xxx', unit_price=2,
+                    unit_type=UnitType.UNIT)
+        a.save()
+        self.cart.add_item(a, 1)
+        self.cart.add_item(a, 2)
+        self.assertEqual(self.cart.items.get().quantity, 3)
+
     def test_is_prepared(self):
         """ True when cart.status is prepared, False otherwise """
         self.assertFalse(self.cart.is_prepared())
@@ -273,6 +742,319 @@ class CartTests(BasketTestCase):
         self.cart.status = CartStatus.DELIVERED
         self.assertFalse(self.cart.is_prepared())
 
+    def test_set_status(self):
+        """ Status changes are logged, starting with cart creation """
+        self.assertEqual(self.cart.status_changes.count(), 1)
+        self.cart.set_status(CartStatus.PREPARED, self.francine)
+        change = self.cart.status_changes.latest('id')
+        self.assertEqual(change.from_status, CartStatus.RECEIVED)
+        self.assertEqual(change.to_status, CartStatus.PREPARED)
+        self.assertEqual(change.user, self.francine)
+        # The log is append-only
+        with self.assertRaises(ValueError):
+            change.save()
+
+
+class ReportTests(BasketTestCase):
+    """
+    Test case for reports computed from the status transition log
+    """
+
+    def setUp(self):
+        self.install_user('francine')
+        self.install_user('reda')
+        self.install_delivery()
+        self.install_slots(3, 7, 120, 1)
+
+    def test_get_throughput_report(self):
+        report = get_throughput_report(self.delivery)
+        self.assertEqual(report['delivery']['baskets'], 0)
+        self.assertIsNone(report['delivery']['median_preparation_time'])
+        self.assertEqual(report['packers'], [])
+        start = timezone.now()
+        for minutes in (10, 20, 60):
+            c = Cart(user=self.francine, slot=self.slot1)
+            c.save()
+            c.status_changes.update(timestamp=start)
+            self.delivery.claim_next_cart(self.reda)
+            c.set_status(CartStatus.PREPARED, self.reda)
+            CartStatusChange.objects.filter(cart=c).exclude(
+                                to_status=CartStatus.RECEIVED).update(
+                    timestamp=start + datetime.timedelta(minutes=minutes))
+        report = get_throughput_report(self.delivery)
+        self.assertEqual(report['delivery']['baskets'], 3)
+        self.assertEqual(report['delivery']['median_preparation_time'],
+                         datetime.timedelta(minutes=20))
+        self.assertIsNone(report['delivery']['median_pickup_time'])
+        self.assertEqual(len(report['packers']), 1)
+        # 3 baskets between 10' and 60' makes 3.6 baskets per hour
+        self.assertAlmostEqual(report['packers'][0]['per_hour'], 3.6)
+        # Packers with the same name are not merged
+        User.objects.filter(id=self.francine.id).update(
+                first_name=self.reda.first_name, last_name=self.reda.last_name)
+        c = Cart(user=self.francine, slot=self.slot1)
+        c.save()
+        c.set_status(CartStatus.PREPARED, self.francine)
+        c.set_status(CartStatus.DELIVERED, self.francine)
+        for status, minutes in ((CartStatus.RECEIVED, 0),
+                                (CartStatus.PREPARED, 30),
+                                (CartStatus.DELIVERED, 40)):
+            c.status_changes.filter(to_status=status).update(
+                    timestamp=start + datetime.timedelta(minutes=minutes))
+        report = get_throughput_report(self.delivery)
+        self.assertEqual([p['user'] for p in report['packers']],
+                         [self.reda.id, self.francine.id])
+        # Median durations of each packer's baskets
+        self.assertEqual([(p['median_preparation_time'],
+                           p['median_pickup_time'])
+                                            for p in report['packers']],
+                         [(datetime.timedelta(minutes=20), None),
+                          (datetime.timedelta(minutes=30),
+                           datetime.timedelta(minutes=10))])
+
+    def test_get_delivery_summary(self):
+        for price, status in ((2, CartStatus.DELIVERED),
+                              (3, CartStatus.RECEIVED),
+                              (5, CartStatus.ABANDONED)):
+            c = Cart(user=self.francine, slot=self.slot1)
+            c.save()
+            CartItem(cart=c, label='x', unit_price=price,
+                     unit_type=UnitType.UNIT, quantity=2).save()
+            CartItem(cart=c, label='y', unit_price=1,
+                     unit_type=UnitType.WEIGHT, quantity=0.5).save()
+            c.set_status(status)
+        self.delivery.refresh_from_db()
+        with self.assertNumQueries(2):
+            summary = get_delivery_summary(self.delivery)
+        # Abandoned cart does not count in revenue
+        total = summary['delivery']
+        self.assertEqual(total['revenue'], 11)
+        self.assertEqual(total['average_basket'], 5.5)
+        self.assertEqual((total['carts'], total['received'],
+                          total['delivered'], total['abandoned']),
+                         (3, 1, 1, 1))
+        self.assertEqual(summary['slots'][0]['id'], self.slot1.id)
+        self.assertEqual(summary['slots'][0]['revenue'], 11)
+        # Cached until the delivery changes
+        with self.assertNumQueries(0):
+            get_delivery_summary(self.delivery)
+        Cart(user=self.francine, slot=self.slot1).save()
+        self.delivery.refresh_from_db()
+        self.assertEqual(get_delivery_summary(self.delivery)['delivery']
+                                                            ['received'], 2)
+
+
+class ForecastTests(BasketTestCase):
+    """
+    Test case for needed quantities forecasts
+    """
+
+    fixtures = ['users.json', 'articles.json']
+
+    def setUp(self):
+        self.install_user('francine')
+        self.install_delivery()
+        self.article = Article.objects.get(code=1)
+        self.other = Article.objects.get(code=2)
+        location = self.delivery.location
+        for days, quantity in ((-21, 1), (-14, 2), (-7, 3)):
+            self.install_slots(days, 7, 120, 1)
+            c = Cart(user=self.francine, slot=self.slot1)
+            c.save()
+            c.add_item(self.article, quantity)
+            self.delivery = Delivery(location=location)
+            self.delivery.save()
+        self.install_slots(7, 7, 120, 1)
+
+    @unittest.skipUnless(forecast.np, 'NumPy is not installed')
+    @override_settings(FORECAST_WINDOW=2, FORECAST_DECAY=0.5)
+    def test_get_needed_quantities(self):
+        Cart(user=self.francine, slot=self.slot1).save()
+        self.slot1.carts.get().add_item(self.other, 1)
+        orders = forecast.get_needed_quantities(self.delivery)
+        self.assertEqual([(o['label'], o['quantity'], o['forecast'])
+                                                        for o in orders],
+                         [(self.other.label, 1, None),
+                          # (2 * 0.5 + 3) / 1.5
+                          (self.article.label, 0, Decimal('2.667'))])
+        # Only deliveries within the window are loaded
+        delivery_ids, article_ids, quantities = \
+                                    forecast.get_history(self.delivery)
+        self.assertEqual(quantities.tolist(), [[2, 3]])
+
+    @unittest.skipUnless(forecast.np, 'NumPy is not installed')
+    @override_settings(FORECAST_WINDOW=2, FORECAST_DECAY=0.5)
+    def test_open_delivery(self):
+        upcoming = self.delivery
+        # Earlier delivery still taking orders, not part of the history
+        self.delivery = Delivery(location=upcoming.location)
+        self.delivery.save()
+        self.install_slots(3, 7, 120, 1)
+        c = Cart(user=self.francine, slot=self.slot1)
+        c.save()
+        c.add_item(self.article, 1)
+        delivery_ids, article_ids, quantities = \
+                                    forecast.get_history(upcoming)
+        self.assertNotIn(self.delivery.id, delivery_ids)
+        self.assertEqual(quantities.tolist(), [[2, 3]])
+        self.assertEqual(forecast.forecast_quantities(upcoming),
+                         {self.article.id: Decimal('2.667')})
+
+
+class ArchiveTests(BasketTestCase):
+    """
+    Test case for cart archival
+    """
+
+    def setUp(self):
+        self.install_user('francine')
+        self.install_delivery()
+        self.install_slots(-10, 7, 120, 1)
+
+    def test_archive_carts(self):
+        delivered = Cart(user=self.francine, slot=self.slot1)
+        delivered.save()
+        CartItem(cart=delivered, label='xxx', unit_price=2,
+                 unit_type=UnitType.UNIT, quantity=3).save()
+        delivered.set_status(CartStatus.DELIVERED)
+        pending = Cart(user=self.francine, slot=self.slot1)
+        pending.save()
+        # Delivery is not old enough
+        before = timezone.now() - datetime.timedelta(days=30)
+        self.assertEqual(archive_carts(before), 0)
+        # Only the closed cart is moved, along with its items and history
+        before = timezone.now()
+        self.assertEqual(archive_carts(before, batch_size=1), 1)
+        self.assertFalse(Cart.objects.filter(id=delivered.id).exists())
+        self.assertTrue(Cart.objects.filter(id=pending.id).exists())
+        archived = ArchivedCart.objects.get(id=delivered.id)
+        self.assertEqual(archived.status, CartStatus.DELIVERED)
+        self.assertEqual(archived.items.get().quantity, 3)
+        self.assertEqual(archived.status_changes.count(), 2)
+
+    def test_reports(self):
+        self.install_user('reda')
+        for status in (CartStatus.DELIVERED, CartStatus.PREPARED):
+            c = Cart(user=self.francine, slot=self.slot1)
+            c.save()
+            CartItem(cart=c, label='xxx', unit_price=2,
+                     unit_type=UnitType.UNIT, quantity=3).save()
+            self.delivery.claim_next_cart(self.reda)
+            c.set_status(CartStatus.PREPARED, self.reda)
+            if status == CartStatus.DELIVERED:
+                c.set_status(status, self.reda)
+        before = (get_throughput_report(self.delivery),
+                  get_delivery_summary(self.delivery))
+        self.assertEqual(archive_carts(timezone.now()), 1)
+        # Archived carts are still reported on
+        cache.clear()
+        self.assertEqual((get_throughput_report(self.delivery),
+                          get_delivery_summary(self.delivery)), before)
+        self.assertEqual(before[0]['delivery']['baskets'], 2)
+        self.assertEqual(before[1]['delivery']['revenue'], 12)
+
+
+class StockTests(BasketTestCase):
+    """
+    Test case for per-delivery stock reservations
+    """
+    fixtures = ['articles.json', 'users.json']
+
+    def setUp(self):
+        self.install_user('francine')
+        self.install_delivery()
+        self.install_slots(3, 7, 120, 1)
+        self.cart = Cart(user=self.francine, slot=self.slot1)
+        self.cart.save()
+        self.article = Article.objects.get(code=1)
+
+    def test_reservations(self):
+        other = Article.objects.get(code=2)
+        # Without stock, quantities are not limited
+        self.assertTrue(self.cart.add_item(other, 100))
+        stock = DeliveryStock(delivery=self.delivery, article=self.article,
+                              quantity=3)
+        stock.save()
+        self.assertTrue(self.cart.add_item(self.article, 2))
+        self.assertFalse(self.cart.add_item(self.article, 2))
+        self.assertTrue(self.cart.add_item(self.article, 1))
+        stock.refresh_from_db()
+        self.assertEqual(stock.reserved, 3)
+        # Deleted items give stock back
+        self.cart.items.get(label=self.article.label).delete()
+        stock.refresh_from_db()
+        self.assertEqual(stock.reserved, 0)
+        # So do abandoned carts, only once
+        self.assertTrue(self.cart.add_item(self.article, 1))
+        self.cart.set_status(CartStatus.ABANDONED)
+        stock.refresh_from_db()
+        self.assertEqual(stock.reserved, 0)
+        self.cart.items.get(label=self.article.label).delete()
+        stock.refresh_from_db()
+        self.assertEqual(stock.reserved, 0)
+
+    def test_line_added_before_stock(self):
+        self.assertTrue(self.cart.add_item(self.article, 2))
+        stock = DeliveryStock(delivery=self.delivery, article=self.article,
+                              quantity=3)
+        stock.save()
+        # Not reserved, since deleting the line would not release it
+        self.assertTrue(self.cart.add_item(self.article, 1))
+        stock.refresh_from_db()
+        self.assertEqual(stock.reserved, 0)
+        self.assertEqual(self.cart.items.get().quantity, 3)
+
+    def test_negative_quantity(self):
+        stock = DeliveryStock(delivery=self.delivery, article=self.article,
+                              quantity=1)
+        stock.save()
+        form = CartItemForm({'article': '1', 'quantity': '-5'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('quantity', form.errors)
+        for quantity in (-5, 0):
+            with self.assertRaises(ValueError):
+                self.cart.add_item(self.article, quantity)
+            with self.assertRaises(ValueError):
+                DeliveryStock.reserve(stock.id, quantity)
+        stock.refresh_from_db()
+        self.assertEqual(stock.reserved, 0)
+        self.assertFalse(self.cart.items.exists())
+        self.assertFalse(self.cart.add_item(self.article, 6))
+
+    def test_admin_keeps_reservations(self):
+        stock = DeliveryStock(delivery=self.delivery, article=self.article,
+                              quantity=3)
+        stock.save()
+        self.install_user('jerome')
+        self.jerome.is_staff = True
+        self.jerome.is_superuser = True
+        self.jerome.save()
+        self.client.login(username='jerome', password='jerome')
+        data = {'location': self.delivery.location_id,
+                'max_per_slot': 0,
+                'stocks-TOTAL_FORMS': 1,
+                'stocks-INITIAL_FORMS': 1,
+                'stocks-0-id': stock.id,
+                'stocks-0-delivery': self.delivery.id,
+                'stocks-0-article': self.article.id,
+                'stocks-0-quantity': 5}
+        save_model = DeliveryAdmin.save_model
+
+        def reserve_meanwhile(*args):
+            # Order placed after the stock form was loaded
+            self.assertTrue(self.cart.add_item(self.article, 2))
+            save_model(*args)
+
+        with unittest.mock.patch.object(DeliveryAdmin, 'save_model',
+                                        reserve_meanwhile):
+            response = self.client.post(
+                    reverse('admin:baskets_delivery_change',
+                            args=[self.delivery.id]), data)
+        self.assertEqual(response.status_code, 302)
+        stock.refresh_from_db()
+        self.assertEqual((stock.quantity, stock.reserved), (5, 2))
+
+
 class CartItemTests(BasketTestCase):
     """
     Test case for CartItem model.
@@ -295,6 +1077,262 @@ class CartItemTests(BasketTestCase):
         self.assertTrue(hasattr(i, 'price'))
         self.assertEqual(i.price, 1.25)
 
+
+class CommandTests(BasketTestCase):
+    """
+    Test case for management commands
+    """
+
+    def test_check_query_plans(self):
+        # Hot queries must all be served by an index
+        out = io.StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('No full table scan.', out.getvalue())
+
+    def test_sweep_sessions(self):
+        now = timezone.now()
+        Session.objects.create(session_key='expired', session_data='',
+                               expire_date=now - datetime.timedelta(days=1))
+        Session.objects.create(session_key='active', session_data='',
+                               expire_date=now + datetime.timedelta(days=1))
+        call_command('sweep_sessions', batch_size=1, stdout=io.StringIO())
+        self.assertEqual(
+                list(Session.objects.values_list('session_key', flat=True)),
+                ['active'])
+
+    def test_benchmark_templates(self):
+        self.install_user('francine')
+        self.install_delivery()
+        self.install_slots(3, 7, 120, 1)
+        Cart(user=self.francine, slot=self.slot1).save()
+        out = io.StringIO()
+        call_command('benchmark_templates', self.delivery.id, 'jerome',
+                     repeat=1, stdout=out)
+        self.assertIn('prepare_baskets', out.getvalue())
+
+    def test_export_orders(self):
+        self.install_user('francine')
+        self.install_delivery()
+        self.install_slots(3, 7, 120, 1)
+        cart = Cart(user=self.francine, slot=self.slot1)
+        cart.save()
+        for label in ('x', 'y'):
+            CartItem(cart=cart, label=label, unit_price=2,
+                     unit_type=UnitType.UNIT, quantity=1.5).save()
+
+        def read(directory, prefix):
+            files = sorted(f for f in os.listdir(directory)
+                             if f.startswith(prefix) and
+                                f.endswith('.csv.gz'))
+            rows = []
+            for name in files:
+                with gzip.open(os.path.join(directory, name), 'rt') as f:
+                    rows.append([r['label'] for r in csv.DictReader(f)])
+            return rows
+
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_orders', directory, format='csv',
+                         chunk_size=1, stdout=io.StringIO())
+            with gzip.open(os.path.join(directory, os.listdir(directory)[0]),
+                           'rt') as f:
+                row = next(csv.DictReader(f))
+            self.assertEqual(row['quantity'], '1.500')
+            self.assertEqual(row['location'], 'Somewhere')
+            # Current items are exported in full each time
+            cart.items.get(label='x').delete()
+            call_command('export_orders', directory, format='csv',
+                         stdout=io.StringIO())
+            self.assertEqual(read(directory, 'cartitem-'),
+                             [['x', 'y'], ['y']])
+            # Only new archived items are exported the next time
+            cart.set_status(CartStatus.DELIVERED)
+            self.slot1.start -= datetime.timedelta(days=30)
+            self.slot1.end -= datetime.timedelta(days=30)
+            self.slot1.save()
+            archive_carts(timezone.now())
+            for i in range(2):
+                call_command('export_orders', directory, archived=True,
+                             format='csv', stdout=io.StringIO())
+            self.assertEqual(read(directory, 'archivedcartitem-'), [['y']])
+
+
+class SessionStorageTests(BasketTestCase):
+    """
+    Benchmark of `django_session` queries caused by customer requests
+    """
+    fixtures = ['users.json', 'merchants.json']
+
+    def setUp(self):
+        self.install_user('francine')
+        self.install_delivery()
+        self.install_slots(3, 7, 120, 1)
+        self.delivery.max_per_slot = 1
+        self.delivery.save()
+        self.cart = Cart(user=self.francine, slot=self.slot1)
+        self.cart.save()
+
+    def count_session_queries(self):
+        """
+        Play a customer hitting a full delivery (which flashes a message
+        across a redirect) then going back to their cart, return the number
+        of session reads and writes per request
+        """
+        client = Client()
+        client.force_login(self.francine)
+        paths = [reverse('new_cart', args=[self.delivery.id]),
+                 reverse('merchant'),
+                 reverse('cart', args=[self.cart.id])]
+        with CaptureQueriesContext(connection) as ctx:
+            for path in paths:
+                client.get(path)
+        queries = [q['sql'] for q in ctx.captured_queries
+                                            if 'django_session' in q['sql']]
+        writes = [q for q in queries if not q.startswith('SELECT')]
+        return ((len(queries) - len(writes)) / len(paths),
+                len(writes) / len(paths))
+
+    def test_session_queries(self):
+        # Database sessions holding messages (messages overflowing the
+        # cookie of the default FallbackStorage end up there)
+        with self.settings(
+                SESSION_ENGINE='django.contrib.sessions.backends.db',
+                MESSAGE_STORAGE='django.contrib.messages.storage.session.'
+                                'SessionStorage'):
+            reads, writes = self.count_session_queries()
+        # Flashed message stored then consumed: 2 writes over 3 requests
+        self.assertEqual(reads, 1)
+        self.assertAlmostEqual(writes, 2 / 3)
+        # Cached sessions and cookie messages: the database is not involved
+        reads, writes = self.count_session_queries()
+        self.assertEqual(reads, 0)
+        self.assertEqual(writes, 0)
+
+
+class AdmissionControlTests(BasketTestCase):
+    """
+    Test case for admission control of order writes
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.install_user('francine')
+        self.install_delivery()
+        self.install_slots(3, 7, 120, 1)
+
+    @override_settings(ADMISSION_RATE=2, ADMISSION_PERIOD=60)
+    def test_rate(self):
+        self.client.login(username='francine', password='francine')
+        path = reverse('new_cart', args=[self.delivery.id])
+        for i in range(2):
+            self.assertEqual(self.client.get(path).status_code, 302)
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 429)
+        self.assertLessEqual(int(response['Retry-After']), 60)
+        self.assertEqual(Cart.objects.count(), 2)
+        # Reading a cart is not limited
+        cart = Cart.objects.first()
+        path = reverse('cart', args=[cart.id])
+        self.assertEqual(self.client.get(path).status_code, 200)
+
+    @override_settings(ADMISSION_MAX_IN_FLIGHT=1)
+    def test_in_flight(self):
+        responses = []
+        factory = RequestFactory()
+
+        @admission_control()
+        def view(request):
+            if not responses:
+                # Second request while the first one is processed
+                responses.append(view(request))
+            return HttpResponse()
+
+        request = factory.post('/')
+        request.user = self.francine
+        self.assertEqual(view(request).status_code, 200)
+        self.assertEqual(responses[0].status_code, 503)
+        self.assertEqual(responses[0]['Retry-After'], '1')
+        # Slot is released once processed
+        self.assertEqual(view(request).status_code, 200)
+
+
+class ReplicaRoutingTests(TestCase):
+    """
+    Test case for read replica routing
+    """
+
+    @override_settings(REPLICA_DATABASE='replica')
+    def test_router(self):
+        router = ReplicaRouter()
+        # Outside of requests, everything goes to the default database
+        self.assertIsNone(router.db_for_read(Article))
+        reads = []
+
+        @use_replica
+        def view(request):
+            reads.append(router.db_for_read(Article))
+            if 'write' in request.GET:
+                router.db_for_write(Article)
+                reads.append(router.db_for_read(Article))
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(view)
+        factory = RequestFactory()
+        response = middleware(factory.get('/'))
+        self.assertEqual(reads, ['replica'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        # Reads after a write see it
+        response = middleware(factory.get('/', {'write': 1}))
+        self.assertEqual(reads[1:], ['replica', None])
+        self.assertIn(PIN_COOKIE, response.cookies)
+        # So do requests of a client which wrote recently
+        request = factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        middleware(request)
+        middleware(factory.post('/'))
+        self.assertEqual(reads[3:], [None, None])
+        # Views which did not opt in read from the default database
+        ReplicaPinningMiddleware(view.__wrapped__)(factory.get('/'))
+        self.assertEqual(reads[5:], [None])
+
+
+class StaticFilesTests(TestCase):
+    """
+    Test case for vendor static files finder and compressed storage
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        with open(os.path.join(self.tmp, 'package.json'), 'w') as f:
+            json.dump({'dependencies': {'lib': '^1.0.0'}}, f)
+        vendor = os.path.join(self.tmp, 'node_modules', 'lib')
+        os.makedirs(vendor)
+        for name in ('used.css', 'unused.css'):
+            with open(os.path.join(vendor, name), 'w') as f:
+                f.write('body { color: black; }\n' * 50)
+
+    def test_collectstatic(self):
+        static_root = os.path.join(self.tmp, 'static_root')
+        with self.settings(
+                STATICFILES_DIRS=[],
+                STATICFILES_FINDERS=['marketbasket.staticfiles.VendorFinder'],
+                VENDOR_STATIC_ROOT=os.path.join(self.tmp, 'node_modules'),
+                VENDOR_STATIC_FILES=['lib/used.css'],
+                STATIC_ROOT=static_root,
+                STATICFILES_STORAGE='marketbasket.staticfiles.'
+                                    'CompressedManifestStorage'):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        files = os.listdir(os.path.join(static_root, 'lib'))
+        # Only allowed files are collected, hashed and compressed
+        self.assertIn('used.css', files)
+        self.assertIn('used.css.gz', files)
+        self.assertNotIn('unused.css', files)
+        self.assertEqual(
+                len([f for f in files if f.endswith('.css.gz')]), 2)
+
+
 class ViewTests(BasketTestCase):
     """
     Test case for views
@@ -326,7 +1364,6 @@ class ViewTests(BasketTestCase):
         response = self.client.get(reverse('merchant'))
         self.assertTrue(response.context['deliveries'][0]['is_full'])
 
-
     def test_needed_quantities(self):
         """
         Needed quantities view
@@ -376,6 +1413,40 @@ class ViewTests(BasketTestCase):
         self.assertEqual(response.status_code, 302)
         self.assertEqual(response.url, error_path)
 
+    def test_reorder(self):
+        """
+        Reorder view
+        """
+        previous = Cart(user=self.francine, slot=self.slot1)
+        previous.save()
+        for code in (1, 2):
+            self.assertTrue(
+                    previous.add_item(Article.objects.get(code=code), 1))
+        CartItem(cart=previous, label='Gone', unit_price=1,
+                 unit_type=UnitType.UNIT, quantity=1).save()
+        path = reverse('reorder', args=[previous.id])
+        self.client.login(username='reda', password='reda')
+        # Only own carts can be copied
+        response = self.client.post(path, {'delivery': self.delivery.id})
+        self.assertEqual(response.status_code, 404)
+        self.client.login(username='francine', password='francine')
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 400)
+        # Available articles are copied at current price
+        Article.objects.filter(code=1).update(unit_price=42)
+        response = self.client.post(path, {'delivery': self.delivery.id})
+        cart = Cart.objects.latest('id')
+        self.assertRedirects(response, reverse('cart', args=[cart.id]))
+        self.assertEqual(cart.slot, self.slot1)
+        self.assertEqual(cart.items.count(), 2)
+        self.assertEqual(cart.items.get(label='Mesclun').unit_price, 42)
+        # No cart is created when items cannot be copied
+        count = Cart.objects.count()
+        with unittest.mock.patch.object(Cart, 'copy_items',
+                                        side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.client.post(path, {'delivery': self.delivery.id})
+        self.assertEqual(Cart.objects.count(), count)
 
     def cart_final_tests(self, response):
         """ Helper method for testing context returned by cart view """
@@ -386,6 +1457,16 @@ class ViewTests(BasketTestCase):
         self.assertIn('cart', response.context)
         self.assertEqual(response.status_code, 200)
 
+    def test_article_search(self):
+        """
+        Article search view
+        """
+        path = reverse('article_search')
+        self.client.login(username='francine', password='francine')
+        response = self.client.get(path, {'q': '2'})
+        codes = [a['code'] for a in response.json()['articles']]
+        self.assertEqual(codes, [2, 20, 21])
+
     def test_cart_get(self):
         """
         Cart view (called with GET method)
@@ -451,6 +1532,40 @@ class ViewTests(BasketTestCase):
         self.assertEqual(c.annotation, 'bla')
         self.cart_final_tests(response)
 
+    def test_cart_queries(self):
+        """
+        Cart page is loaded in a fixed number of queries
+        """
+        self.client.login(username='francine', password='francine')
+        self.install_slots(3, 9, 120, 2)
+        c = Cart(user=self.francine, slot=self.slot1)
+        c.save()
+        path = reverse('cart', args=[c.id])
+        for code in (1, 2):
+            # Rendering the item list rather than reading it from the cache:
+            # session, user, cart, items and slots of the delivery
+            cache.clear()
+            with self.assertNumQueries(5):
+                response = self.client.get(path)
+            self.assertIn('slot_form', response.context)
+            c.add_item(Article.objects.get(code=code), 1)
+        self.assertContains(response, '<td>Mesclun</td>')
+
+    def test_cart_cached_items(self):
+        """
+        Cached item list is refreshed when the cart changes
+        """
+        self.client.login(username='francine', password='francine')
+        c = Cart(user=self.francine, slot=self.slot1)
+        c.save()
+        path = reverse('cart', args=[c.id])
+        response = self.client.get(path)
+        self.assertNotContains(response, '<td>Mesclun</td>')
+        self.client.post(path, {'article': '1', 'quantity': '1',
+                                'item_submit': ''})
+        response = self.client.get(path)
+        self.assertContains(response, '<td>Mesclun</td>')
+
     def test_prepare_baskets(self):
         """
         Prepare baskets view (list all baskets to be prepared)
@@ -483,6 +1598,23 @@ class ViewTests(BasketTestCase):
         self.assertEqual(c.status, CartStatus.DELIVERED)
         self.assertEqual(response.status_code, 200)
 
+    def test_throughput_report(self):
+        """
+        Throughput report view
+        """
+        path = reverse('throughput_report', args=[self.delivery.id])
+        redirect_path = '{0}?next={1}'.format(settings.LOGIN_URL, path)
+        # authenticated user lacking permission (Francine is in Customer)
+        self.client.login(username='francine', password='francine')
+        response = self.client.get(path)
+        self.assertRedirects(response, redirect_path)
+        self.client.logout()
+        # authenticated user with permission (Jerome is in Merchant)
+        self.client.login(username='jerome', password='jerome')
+        response = self.client.get(path)
+        self.assertIn('report', response.context)
+        self.assertEqual(response.status_code, 200)
+
     def test_prepare_basket(self):
         """
         Prepare basket view (show one basket to be prepared)
@@ -518,3 +1650,25 @@ class ViewTests(BasketTestCase):
         c.refresh_from_db()
         self.assertEqual(c.status, CartStatus.PREPARED)
         self.assertEqual(response.status_code, 302)
+
+    def test_claim_basket(self):
+        """
+        Claim basket view (packer takes the next basket to be prepared)
+        """
+        c = Cart(user=self.francine, slot=self.slot1)
+        c.save()
+        path = reverse('claim_basket', args=[self.delivery.id])
+        list_path = reverse('prepare_baskets', args=[self.delivery.id])
+        self.client.login(username='reda', password='reda')
+        # GET does not claim anything
+        response = self.client.get(path)
+        self.assertRedirects(response, list_path)
+        # First POST claims the only cart, the second one finds nothing
+        response = self.client.post(path)
+        self.assertRedirects(response,
+                             reverse('prepare_basket', args=[c.id]))
+        c.refresh_from_db()
+        self.assertEqual(c.status, CartStatus.PREPARING)
+        self.assertEqual(c.packer, self.reda)
+        response = self.client.post(path)
+        self.assertRedirects(response, list_path)
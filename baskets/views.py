@@ -4,19 +4,28 @@ from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django.shortcuts import get_object_or_404, render
 from django.conf import settings
-from django.http import HttpResponseRedirect, Http404
+from django.http import HttpResponse, HttpResponseRedirect, Http404, \
+                        JsonResponse
 from django.core.exceptions import SuspiciousOperation
 from django.urls import reverse_lazy
 from django.contrib.auth.decorators import permission_required, login_required
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Min, Count, Prefetch
 
 from .models import Delivery, DeliverySlot, \
                     Cart, CartItem, CartStatus, \
                     Merchant
-from .forms import SlotForm, AnnotationForm, DelItemForm, CartItemForm
+from .forms import SlotForm, AnnotationForm, DelItemForm, CartItemForm, \
+                   ReorderForm
+from .reports import get_throughput_report, get_delivery_summary
+from .search import search_articles
+from .slips import render_slips
+from marketbasket.admission import admission_control
+from marketbasket.db import use_replica
 
 
+@use_replica
 def merchant(request):
     # FIXME: switch to multi-merchant app and remove hard-coded merchant id
     merchant = get_object_or_404(Merchant, id=1)
@@ -42,12 +51,21 @@ def merchant(request):
                         lambda x, y: x and y.cart_count >= d.max_per_slot,
                         d.slots.all(), True)
             } for d in qs]
+    # Customers may order the same basket as last time
+    last_cart = None
+    if request.user.is_authenticated:
+        last_cart = Cart.objects.filter(user=request.user,
+                                        items__isnull=False) \
+                                .order_by('-id').first()
+
     return render(request, 'baskets/merchant.html', {
                                             'merchant': merchant,
                                             'contacts': contacts,
-                                            'deliveries': deliveries})
+                                            'deliveries': deliveries,
+                                            'last_cart': last_cart})
 
 
+@use_replica
 @login_required
 @permission_required('baskets.view_delivery_quantities')
 def needed_quantities(request):
@@ -60,20 +78,53 @@ def needed_quantities(request):
                                                     {'deliveries': deliveries})
 
 
+@use_replica
 @login_required
+@permission_required('baskets.view_delivery_quantities')
+def throughput_report(request, id):
+    """Basket preparation throughput for a delivery"""
+    try:
+        delivery = Delivery.objects.annotate(start=Min('slots__start')).get(pk=id)
+    except Delivery.DoesNotExist:
+        raise Http404("No Delivery matches the given query.")
+
+    return render(request, 'baskets/throughput_report.html', {
+                                'delivery': delivery,
+                                'report': get_throughput_report(delivery)})
+
+
+@use_replica
+@login_required
+@permission_required('baskets.view_delivery_quantities')
+def delivery_summary(request, id):
+    """Revenue and cart counts per slot for a delivery"""
+    try:
+        delivery = Delivery.objects.annotate(start=Min('slots__start')).get(pk=id)
+    except Delivery.DoesNotExist:
+        raise Http404("No Delivery matches the given query.")
+
+    return render(request, 'baskets/delivery_summary.html', {
+                                'delivery': delivery,
+                                'summary': get_delivery_summary(delivery)})
+
+
+@use_replica
+@login_required
+@permission_required('baskets.view_delivery_quantities')
+def delivery_summary_api(request, id):
+    """Revenue and cart counts per slot for a delivery, as JSON"""
+    delivery = get_object_or_404(Delivery, id=id)
+    return JsonResponse(get_delivery_summary(delivery))
+
+
+@login_required
+@admission_control()
 def new_cart(request, id):
     """A buyer can start a new cart"""
     # Retrieve delivery
     delivery = get_object_or_404(Delivery, id=id)
 
-    if delivery.max_per_slot> 0:
-        # Retrieve first slot not having reached max_per_slot
-        slot = delivery.slots.annotate(cart_count=Count('carts')) \
-                              .filter(cart_count__lt=delivery.max_per_slot) \
-                              .order_by('start').first()
-    else:
-        # Retrieve first slot (cart limit being disabled)
-        slot = delivery.slots.order_by('start').first()
+    slot = delivery.get_free_slot()
 
     # No free time slot, return with an error message
     if slot is None:
@@ -88,14 +139,54 @@ def new_cart(request, id):
     return HttpResponseRedirect(reverse_lazy('cart', args=[cart.id]))
 
 
+@login_required
+@admission_control()
+def reorder(request, id):
+    """A buyer starts a new cart with the items of a previous one"""
+    previous = get_object_or_404(Cart, id=id, user=request.user)
+
+    form = ReorderForm(request.POST)
+    if request.method != 'POST' or not form.is_valid():
+        raise SuspiciousOperation()
+    delivery = form.cleaned_data['delivery']
+
+    slot = delivery.get_free_slot()
+    if slot is None:
+        msg = _('This delivery is full and does not accept any new order.')
+        messages.error(request, msg)
+        return HttpResponseRedirect(reverse_lazy('merchant'))
+
+    # No empty cart is left behind if copying fails
+    with transaction.atomic():
+        cart = Cart(user=request.user, slot=slot)
+        cart.save()
+        missing = cart.copy_items(previous)
+    if missing:
+        msg = _('Some articles could not be added: {labels:s}').format(
+                                                labels=', '.join(missing))
+        messages.warning(request, msg)
+
+    return HttpResponseRedirect(reverse_lazy('cart', args=[cart.id]))
+
+
+@login_required
+def article_search(request):
+    """Articles matching a code prefix or part of a label"""
+    articles = search_articles(request.GET.get('q', ''))
+    return JsonResponse({'articles': [{
+            'code': a.code,
+            'label': a.label,
+            'price': a.hr_unit_price(),
+            } for a in articles]})
 
 
 @login_required
+@admission_control(methods=['POST'])
 def cart(request, id):
     """A buyer can see or edit his orders"""
-    cart = get_object_or_404(Cart, id=id)
+    cart = get_object_or_404(Cart.objects.with_details(), id=id)
 
-    if cart.user.id != request.user.id:
+    if cart.user_id != request.user.id:
         return HttpResponseRedirect(
                 '{0}?next={1}'.format(settings.LOGIN_URL, request.path))
 
@@ -111,12 +202,10 @@ def cart(request, id):
             item_form = CartItemForm(request.POST)
             if item_form.is_valid():
                 a = item_form.cleaned_data['article']
-                CartItem(cart=cart,
-                         label=a.label,
-                         unit_price=a.unit_price,
-                         unit_type=a.unit_type,
-                         quantity=item_form.cleaned_data['quantity']
-                         ).save()
+                if not cart.add_item(a, item_form.cleaned_data['quantity']):
+                    msg = _('Not enough "{label:s}" left for this delivery.') \
+                                                        .format(label=a.label)
+                    messages.error(request, msg)
         elif 'del_submit' in request.POST:
             form = DelItemForm(request.POST)
             if form.is_valid():
@@ -146,6 +235,8 @@ def cart(request, id):
                 annot_timestamp = now()
         else:
             raise SuspiciousOperation()
+        # Items, slot or version stamp may have changed
+        cart = Cart.objects.with_details().get(id=cart.id)
 
     # Build context object
     context = {
@@ -153,26 +244,27 @@ def cart(request, id):
             'annot_form': annot_form,
             'annot_timestamp': annot_timestamp,
             'item_form': item_form}
-    if cart.slot.delivery.slots.count() > 1:
+    if cart.slot_count > 1:
         context['slot_form'] = slot_form
 
     return render(request, 'baskets/cart.html', context)
 
 
+@use_replica
 @login_required
 @permission_required('baskets.prepare_basket')
 def prepare_baskets(request, id):
     """A packer view baskets to be prepared"""
+    if request.method == 'POST' and 'delivered_cart' in request.POST:
+        cart = get_object_or_404(Cart, id=request.POST['delivered_cart'])
+        cart.set_status(CartStatus.DELIVERED, request.user)
+
+    # Retrieved after any update so that its version stamp is current
     try:
         delivery = Delivery.objects.annotate(start=Min('slots__start')).get(pk=id)
     except Delivery.DoesNotExist:
         raise Http404("No Delivery matches the given query.")
 
-    if request.method == 'POST' and 'delivered_cart' in request.POST:
-        cart = get_object_or_404(Cart, id=request.POST['delivered_cart'])
-        cart.status = CartStatus.DELIVERED
-        cart.save()
-
     return render(request, 'baskets/prepare_baskets.html',
                                             {'delivery': delivery})
 
@@ -185,18 +277,49 @@ def prepare_basket(request, id):
 
     if request.method == 'POST':
         if 'ready' in request.POST:
-            basket.status = CartStatus.PREPARED
-            basket.save()
+            basket.set_status(CartStatus.PREPARED, request.user)
             return HttpResponseRedirect(reverse_lazy('prepare_baskets',
                                              args=[basket.slot.delivery.id]))
         elif 'postpone' in request.POST:
-            basket.status = CartStatus.RECEIVED
-            basket.save()
+            basket.packer = None
+            basket.set_status(CartStatus.RECEIVED, request.user)
             return HttpResponseRedirect(reverse_lazy('prepare_baskets',
                                              args=[basket.slot.delivery.id]))
         elif 'start' in request.POST:
-            basket.status = CartStatus.PREPARING
-            basket.save()
+            if not basket.start_preparing(request.user):
+                msg = _('Someone else is already preparing this basket.')
+                messages.warning(request, msg)
 
     return render(request,'baskets/prepare_basket.html',
                                  {'basket': basket, 'statuses': CartStatus})
+
+
+@use_replica
+@login_required
+@permission_required('baskets.prepare_basket')
+def packing_slips(request, id):
+    """Printable packing slips of all baskets to be prepared for a delivery"""
+    delivery = get_object_or_404(Delivery.objects.select_related('location'),
+                                 id=id)
+    # No process pool in web workers
+    return HttpResponse(render_slips(delivery, processes=1))
+
+
+@login_required
+@permission_required('baskets.prepare_basket')
+def claim_basket(request, id):
+    """A packer takes the next basket to be prepared"""
+    delivery = get_object_or_404(Delivery, id=id)
+
+    if request.method != 'POST':
+        return HttpResponseRedirect(reverse_lazy('prepare_baskets',
+                                                 args=[delivery.id]))
+
+    basket = delivery.claim_next_cart(request.user)
+    if basket is None:
+        messages.info(request, _('There is no basket left to prepare.'))
+        return HttpResponseRedirect(reverse_lazy('prepare_baskets',
+                                                 args=[delivery.id]))
+
+    return HttpResponseRedirect(reverse_lazy('prepare_basket',
+                                             args=[basket.id]))
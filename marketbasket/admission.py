@@ -0,0 +1,105 @@
+"""
+Admission control for MarketBasket project.
+
+When a delivery opens, order writes pour in at once. Rather than letting
+them queue on the database lock until they all time out, views decorated
+with `admission_control` turn excess requests away immediately with a
+"please retry" response and a `Retry-After` header:
+
+- each user may make `ADMISSION_RATE` requests per `ADMISSION_PERIOD`
+  seconds (429 Too Many Requests),
+- at most `ADMISSION_MAX_IN_FLIGHT` requests are processed at once
+  (503 Service Unavailable).
+
+Counters are kept in the `ADMISSION_CACHE` cache. The default local-memory
+cache counts per worker process; use a shared cache (memcached, redis...)
+to count across workers. Setting a limit to 0 disables it.
+"""
+
+import functools
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.translation import gettext as _
+
+
+# In-flight counters expire after that many seconds without being updated,
+# so that counts leaked by killed workers do not stick
+IN_FLIGHT_TIMEOUT = 60
+
+
+def _incr(cache, key, timeout):
+    """
+    Increment counter `key`, creating it with `timeout` if needed
+    """
+    if cache.add(key, 1, timeout):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired in the meantime
+        cache.set(key, 1, timeout)
+        return 1
+
+
+def check_rate(cache, user_key):
+    """
+    Count a request of `user_key`. Return the number of seconds to wait
+    when it is over its rate, None otherwise.
+    """
+    if not settings.ADMISSION_RATE:
+        return None
+    period = settings.ADMISSION_PERIOD
+    now = time.time()
+    window = int(now // period)
+    key = 'admission:rate:{0}:{1:d}'.format(user_key, window)
+    if _incr(cache, key, period) > settings.ADMISSION_RATE:
+        return max(math.ceil((window + 1) * period - now), 1)
+    return None
+
+
+def _retry_response(status, retry_after):
+    response = HttpResponse(
+            _('Too many orders at once, please retry in a few seconds.'),
+            content_type='text/plain; charset=utf-8',
+            status=status)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def admission_control(methods=None):
+    """
+    Decorator limiting requests to a view (only those with HTTP `methods`,
+    if given)
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is not None and request.method not in methods:
+                return view(request, *args, **kwargs)
+            cache = caches[settings.ADMISSION_CACHE]
+
+            user_key = request.user.pk if request.user.is_authenticated \
+                                       else request.META.get('REMOTE_ADDR')
+            retry_after = check_rate(cache, user_key)
+            if retry_after is not None:
+                return _retry_response(429, retry_after)
+
+            cap = settings.ADMISSION_MAX_IN_FLIGHT
+            if not cap:
+                return view(request, *args, **kwargs)
+            key = 'admission:in_flight'
+            try:
+                if _incr(cache, key, IN_FLIGHT_TIMEOUT) > cap:
+                    return _retry_response(503, 1)
+                return view(request, *args, **kwargs)
+            finally:
+                try:
+                    cache.decr(key)
+                except ValueError:
+                    pass
+        return wrapper
+    return decorator
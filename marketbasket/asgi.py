@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'marketbasket.settings')
 
 application = get_asgi_application()
+
+# Compile templates now rather than on the first requests
+from .warmup import warm_templates  # noqa: E402
+warm_templates()
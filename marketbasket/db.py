@@ -0,0 +1,107 @@
+"""
+Database routing for MarketBasket project.
+
+Views decorated with `use_replica` read from the `REPLICA_DATABASE` alias
+(a read-only copy of the primary database) instead of the primary one.
+Writes always go to the primary database.
+
+Replicas lag behind. So that clients see their own writes, a client that
+has just written (or sends a POST request) reads from the primary database
+for the next `REPLICA_PIN_SECONDS` seconds: `ReplicaPinningMiddleware`
+sets a short-lived cookie for that.
+"""
+
+import contextvars
+import functools
+
+from django.conf import settings
+
+
+PIN_COOKIE = 'replica_pin'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class _RequestState:
+    def __init__(self, pinned):
+        # Whether reads of this request must go to the primary database
+        self.pinned = pinned
+        # Whether the view opted in for the replica
+        self.replica = False
+        # Whether this request wrote to the database
+        self.wrote = False
+
+
+# State of the request being processed, None outside requests (management
+# commands, tests calling code directly...)
+_state = contextvars.ContextVar('replica_state', default=None)
+
+
+def use_replica(view):
+    """
+    Decorator sending reads of `view` to the replica database, unless the
+    client has written recently
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _state.get()
+        if state is None:
+            return view(request, *args, **kwargs)
+        state.replica = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            state.replica = False
+    return wrapper
+
+
+class ReplicaPinningMiddleware:
+    """
+    Track writes of each request and pin clients which wrote to the primary
+    database for a while
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _RequestState(PIN_COOKIE in request.COOKIES or
+                              request.method not in SAFE_METHODS)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            response.set_cookie(PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if settings.REPLICA_DATABASE and state is not None and \
+                state.replica and not (state.pinned or state.wrote):
+            return settings.REPLICA_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases hold the same rows
+        dbs = ('default', settings.REPLICA_DATABASE)
+        if obj1._state.db in dbs and obj2._state.db in dbs:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary database
+        if db == settings.REPLICA_DATABASE:
+            return False
+        return None
@@ -22,6 +22,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that session writes count as writes
+    'marketbasket.db.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -34,6 +36,8 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'marketbasket.urls'
 
+# No explicit `loaders`: when DEBUG is False, Django uses the cached loader
+# (templates are compiled once per process, see marketbasket/warmup.py).
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -97,10 +101,25 @@ LOCALE_PATHS = [os.path.join(BASE_DIR, 'locale')]
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 STATICFILES_DIRS = [
-        os.path.join(BASE_DIR, 'node_modules'),
         os.path.join(BASE_DIR, 'static'),
         ]
+STATICFILES_FINDERS = [
+        'django.contrib.staticfiles.finders.FileSystemFinder',
+        'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+        'marketbasket.staticfiles.VendorFinder',
+        ]
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'static_root')
+
+# Front-end assets installed by npm (see package.json) which are actually
+# used by templates. Only these are served and collected.
+VENDOR_STATIC_ROOT = os.path.join(BASE_DIR, 'node_modules')
+VENDOR_STATIC_FILES = [
+        'bootstrap/dist/css/bootstrap.min.css',
+        'bootstrap/dist/js/bootstrap.min.js',
+        'jquery/dist/jquery.min.js',
+        'popper.js/dist/popper.min.js',
+        ]
 
 
 # Media
@@ -108,7 +127,15 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
 
+# Sessions
+# Sessions are read from the cache and only written to the database when
+# they change. `manage.py sweep_sessions` removes expired rows.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
 # MESSAGING
+# Messages travel in a cookie so that flashing one does not write the session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
 MESSAGE_TAGS = {
     10: 'secondary', # Bootstrap integration
     20: 'info',
@@ -118,6 +145,63 @@ MESSAGE_TAGS = {
 }
 
 
+# Article search: lifetime (in seconds) of the in-memory article index of
+# each process. Set 0 to search the database instead.
+ARTICLE_INDEX_TIMEOUT = 300
+
+
+# Archival: closed carts of deliveries over for that many days are moved to
+# archive tables by `manage.py archive_carts`
+CART_ARCHIVE_DAYS = 90
+
+
+# Read replica: alias (in DATABASES, see local_settings.py.example) of a
+# read-only copy of the default database, used by views decorated with
+# `marketbasket.db.use_replica`. Clients read from the default database for
+# REPLICA_PIN_SECONDS after they write, to see their own changes.
+DATABASE_ROUTERS = ['marketbasket.db.ReplicaRouter']
+REPLICA_DATABASE = None
+REPLICA_PIN_SECONDS = 10
+
+
+# Admission control of order writes (see marketbasket/admission.py): each
+# user may place ADMISSION_RATE requests per ADMISSION_PERIOD seconds and
+# at most ADMISSION_MAX_IN_FLIGHT are processed at once. 0 disables a limit.
+# Counters live in the ADMISSION_CACHE cache.
+ADMISSION_CACHE = 'default'
+ADMISSION_RATE = 30
+ADMISSION_PERIOD = 10
+ADMISSION_MAX_IN_FLIGHT = 16
+
+
+# Background jobs (see baskets/jobs.py), run by `manage.py run_jobs`: failed
+# jobs are retried JOBS_MAX_ATTEMPTS times at most, after JOBS_RETRY_DELAY
+# seconds, then twice as long each time. Jobs running for JOBS_TIMEOUT
+# seconds are considered lost and run again, which counts as an attempt.
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 30
+JOBS_TIMEOUT = 600
+
+
+# Pickup notifications: customers are emailed when their basket is ready,
+# PICKUP_NOTIFICATION_DELAY seconds after the first basket of a delivery is
+# prepared, together with those prepared in the meantime (one mail server
+# connection per batch)
+PICKUP_NOTIFICATION_DELAY = 120
+
+
+# Packing slips of a delivery are rendered in that many processes at most
+# by `manage.py render_packing_slips` (web requests render them serially)
+PACKING_SLIP_PROCESSES = 4
+
+
+# Forecast of needed quantities (requires NumPy): moving average over that
+# many past deliveries at the same location, each weighing FORECAST_DECAY
+# times as much as the next one
+FORECAST_WINDOW = 8
+FORECAST_DECAY = 0.8
+
+
 # Import instance-specific settings
 try:
     from .local_settings import *
@@ -0,0 +1,108 @@
+"""
+Static files handling for MarketBasket project.
+
+`VendorFinder` only exposes an allow-list of front-end assets installed by
+npm, instead of the whole `node_modules` tree. `CompressedManifestStorage`
+adds content hashes to file names (for long-lived browser caching) and
+writes pre-compressed copies that the web server can serve directly.
+"""
+
+import gzip
+import json
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import BaseFinder
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core import checks
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class VendorFinder(BaseFinder):
+    """
+    Find files listed in `VENDOR_STATIC_FILES` (paths relative to
+    `VENDOR_STATIC_ROOT`, starting with the npm package name)
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.root = settings.VENDOR_STATIC_ROOT
+        self.files = list(settings.VENDOR_STATIC_FILES)
+        self.storage = FileSystemStorage(location=self.root)
+
+    def get_dependencies(self):
+        package = os.path.join(os.path.dirname(self.root), 'package.json')
+        with open(package) as f:
+            return json.load(f).get('dependencies', {})
+
+    def check(self, **kwargs):
+        errors = []
+        try:
+            dependencies = self.get_dependencies()
+        except (OSError, ValueError) as e:
+            return [checks.Error(
+                        'Cannot read npm dependencies: {0}'.format(e),
+                        id='marketbasket.E001')]
+        for path in self.files:
+            package = path.split('/')[0]
+            if package not in dependencies:
+                errors.append(checks.Error(
+                        '{0} is not an npm dependency.'.format(package),
+                        hint='Add it to package.json or remove {0} from '
+                             'VENDOR_STATIC_FILES.'.format(path),
+                        id='marketbasket.E002'))
+        return errors
+
+    def find(self, path, all=False):
+        matches = []
+        if path in self.files and self.storage.exists(path):
+            match = self.storage.path(path)
+            if not all:
+                return match
+            matches.append(match)
+        return matches
+
+    def list(self, ignore_patterns):
+        for path in self.files:
+            if self.storage.exists(path):
+                yield path, self.storage
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage also saving gzip (and brotli, when available) copies
+    of text files next to the originals
+    """
+    compressed_extensions = ('.css', '.js', '.svg', '.map', '.json', '.txt')
+
+    def post_process(self, *args, **kwargs):
+        names = []
+        for name, hashed_name, processed in super().post_process(*args,
+                                                                 **kwargs):
+            yield name, hashed_name, processed
+            if not isinstance(processed, Exception):
+                names += [name, hashed_name]
+        if kwargs.get('dry_run'):
+            return
+        for name in set(names):
+            if name and name.endswith(self.compressed_extensions):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as f:
+            content = f.read()
+        copies = [('.gz', gzip.compress(content, mtime=0))]
+        if brotli is not None:
+            copies.append(('.br', brotli.compress(content)))
+        for ext, compressed in copies:
+            # Not worth it for tiny files
+            if len(compressed) >= len(content):
+                continue
+            if self.exists(name + ext):
+                self.delete(name + ext)
+            self._save(name + ext, ContentFile(compressed))
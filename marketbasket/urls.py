@@ -25,11 +25,28 @@ urlpatterns = [
     path('delivery/<int:id>/baskets',
                 baskets.views.prepare_baskets,
                 name='prepare_baskets'),
+    path('delivery/<int:id>/claim',
+                baskets.views.claim_basket,
+                name='claim_basket'),
+    path('delivery/<int:id>/slips',
+                baskets.views.packing_slips,
+                name='packing_slips'),
+    path('delivery/<int:id>/report',
+                baskets.views.throughput_report,
+                name='throughput_report'),
+    path('delivery/<int:id>/summary',
+                baskets.views.delivery_summary,
+                name='delivery_summary'),
+    path('delivery/<int:id>/summary.json',
+                baskets.views.delivery_summary_api,
+                name='delivery_summary_api'),
     path('order/<int:id>/prepare',
                 baskets.views.prepare_basket,
                 name='prepare_basket'),
     path('order/<int:id>', baskets.views.cart, name='cart'),
+    path('order/<int:id>/reorder', baskets.views.reorder, name='reorder'),
     path('deliveries', baskets.views.needed_quantities, name='needed_quantities'),
+    path('articles', baskets.views.article_search, name='article_search'),
     path('admin/', admin.site.urls),
     path('accounts/', include('django.contrib.auth.urls')),
 ]
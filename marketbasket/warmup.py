@@ -0,0 +1,27 @@
+"""
+Warm-up of a freshly started worker.
+
+With `DEBUG = False` and no explicit `loaders` option, Django wraps template
+loaders in the cached loader: each template is compiled once per process,
+on first use. Compiling them all when the worker starts keeps that cost off
+the first requests.
+"""
+
+import os
+
+from django.template import engines
+
+
+def warm_templates():
+    """
+    Compile every template found in the project template directories
+    """
+    for engine in engines.all():
+        for directory in engine.engine.dirs:
+            for root, dirs, files in os.walk(directory):
+                for name in files:
+                    if name.endswith('.html'):
+                        path = os.path.join(root, name)
+                        engine.get_template(
+                            os.path.relpath(path, directory).replace(os.sep,
+                                                                     '/'))
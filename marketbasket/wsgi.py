@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'marketbasket.settings')
 
 application = get_wsgi_application()
+
+# Compile templates now rather than on the first requests
+from .warmup import warm_templates  # noqa: E402
+warm_templates()
@@ -4,3 +4,14 @@ $('#navbarNav').on('shown.bs.collapse', function () {
 $('#navbarNav').on('hidden.bs.collapse', function () {
   $('#userDropdown').dropdown('hide');
 });
+// Article quick entry: suggest articles matching the typed code or label
+$('.article-search').on('input', function () {
+  var list = $('#' + $(this).attr('list'));
+  $.getJSON(list.data('url'), {q: $(this).val()}, function (data) {
+    list.empty();
+    $.each(data.articles, function (i, a) {
+      list.append($('<option>').attr('value', a.code)
+                               .text(a.label + ', ' + a.price));
+    });
+  });
+});